@@ -0,0 +1,22 @@
+import csv
+
+from tasks.export import EXPORT_CHUNK_SIZE, Echo
+
+USER_STATS_EXPORT_FIELDS = (
+    'id', 'email', 'first_name', 'last_name', 'role', 'date_joined',
+    'task_count', 'completed_count', 'pending_count', 'completion_rate',
+)
+
+
+def stream_user_stats_csv(stats, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a header line followed by one line per user, read from a server-side cursor"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(USER_STATS_EXPORT_FIELDS)
+    chunk = []
+    for row in stats.values_list(*USER_STATS_EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(writer.writerow([value.isoformat() if hasattr(value, 'isoformat') else value for value in row]))
+        if len(chunk) == chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from analytics.models import DailyTaskRollup, rollup_day
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    """
+    Recount the daily task rollups of a range of days from the task table,
+    a chunk of days per transaction, replacing whatever is stored for them.
+    Use it to backfill the rollups or to repair drift.
+    """
+    help = 'Rebuild the daily task rollups of a range of days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=date.fromisoformat,
+            help='First day to rebuild, as YYYY-MM-DD (default: the day of the oldest task)'
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Last day to rebuild, as YYYY-MM-DD (default: today)'
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Number of days to rebuild per transaction (default: 31)'
+        )
+
+    def handle(self, *args, **options):
+        start = options['start']
+        if start is None:
+            oldest = Task.objects.aggregate(oldest=Min('created_at'))['oldest']
+            start = rollup_day(oldest) if oldest else timezone.localdate()
+        end = options['end'] or timezone.localdate()
+        if end < start:
+            raise CommandError('--end is before --start')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        chunk = timedelta(days=options['chunk_days'])
+        rows = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + chunk, end + timedelta(days=1))
+            rows += len(DailyTaskRollup.rebuild(start=chunk_start, end=chunk_end))
+            self.stdout.write(f'Rebuilt {chunk_start} to {chunk_end - timedelta(days=1)}')
+            chunk_start = chunk_end
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} rollups from {start} to {end}'))
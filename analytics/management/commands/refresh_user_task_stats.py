@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import UserTaskStats
+
+
+class Command(BaseCommand):
+    """
+    Refresh the per-user task statistics of the user analytics pages now.
+    The pages refresh them once they are older than USER_STATS_MAX_AGE (or
+    leave that to the analytics worker), so this is only needed after bulk
+    changes.
+    """
+    help = 'Refresh the materialized per-user task statistics'
+
+    def handle(self, *args, **options):
+        UserTaskStats.refresh()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed task statistics of {UserTaskStats.objects.count()} users'))
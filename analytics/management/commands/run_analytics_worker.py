@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from analytics.tasks import schedule_jobs
+
+
+class Command(BaseCommand):
+    """
+    Run the worker that precomputes the analytics snapshots. It schedules a
+    repeating job per snapshot (replacing the ones already scheduled, so
+    ANALYTICS_JOB_INTERVAL changes take effect) and processes the analytics
+    queue. Set ANALYTICS_BACKGROUND_JOBS=1 on the web processes so that they
+    leave the recomputing to it.
+    """
+    help = 'Precompute the analytics snapshots in the background'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration',
+            type=int,
+            default=0,
+            help='Stop after this many seconds (default: 0, run forever)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds to wait when no job is due (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        schedule_jobs()
+        self.stdout.write(f'Precomputing analytics every {settings.ANALYTICS_JOB_INTERVAL} seconds')
+        call_command(
+            'process_tasks',
+            queue=settings.ANALYTICS_JOB_QUEUE,
+            duration=options['duration'],
+            sleep=options['sleep'],
+        )
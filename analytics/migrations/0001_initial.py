@@ -0,0 +1,45 @@
+# Generated by Django 5.0.2 on 2026-10-17 00:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from analytics.models import count_task_days
+
+
+def backfill_rollups(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    DailyTaskRollup = apps.get_model('analytics', 'DailyTaskRollup')
+    DailyTaskRollup.objects.bulk_create([
+        DailyTaskRollup(user_id=user_id, day=day, created=created, completed=completed, pending_delta=created - completed)
+        for (user_id, day), (created, completed) in count_task_days(Task.objects.all()).items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('tasks', '0006_tasktombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTaskRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('created', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('pending_delta', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_task_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailytaskrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'user'), name='rollup_day_user_unique'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
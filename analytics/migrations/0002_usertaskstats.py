@@ -0,0 +1,92 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# The query as of this migration; later changes to it in analytics.models
+# must not change what this migration does.
+USER_TASK_STATS_SELECT = """
+    SELECT
+        u.id AS user_id,
+        COALESCE(s.task_count, 0) AS task_count,
+        COALESCE(s.completed_count, 0) AS completed_count,
+        COALESCE(s.task_count, 0) - COALESCE(s.completed_count, 0) AS pending_count,
+        CAST(CASE WHEN s.task_count > 0
+            THEN ROUND(s.completed_count * 100.0 / s.task_count, 2)
+            ELSE 0 END AS DOUBLE PRECISION) AS completion_rate,
+        CURRENT_TIMESTAMP AS refreshed_at
+    FROM users_customuser u
+    LEFT JOIN tasks_usertaskstate s ON s.user_id = u.id
+"""
+
+# PostgreSQL keeps the statistics in a materialized view. REFRESH ...
+# CONCURRENTLY needs a unique index on it; the other indexes serve the
+# listings sorted by task count and by completion rate.
+POSTGRESQL_FORWARD = [
+    f'CREATE MATERIALIZED VIEW analytics_usertaskstats AS {USER_TASK_STATS_SELECT}',
+    'CREATE UNIQUE INDEX usertaskstats_user_idx ON analytics_usertaskstats (user_id)',
+    'CREATE INDEX usertaskstats_task_count_idx ON analytics_usertaskstats (task_count DESC, user_id)',
+    'CREATE INDEX usertaskstats_completion_idx ON analytics_usertaskstats (completion_rate DESC, user_id)',
+]
+POSTGRESQL_BACKWARD = [
+    'DROP MATERIALIZED VIEW IF EXISTS analytics_usertaskstats',
+]
+
+# Other backends keep a table that a refresh empties and fills again.
+TABLE_FORWARD = [
+    """
+    CREATE TABLE analytics_usertaskstats (
+        user_id integer NOT NULL PRIMARY KEY,
+        task_count integer NOT NULL,
+        completed_count integer NOT NULL,
+        pending_count integer NOT NULL,
+        completion_rate double precision NOT NULL,
+        refreshed_at datetime NOT NULL
+    )
+    """,
+    'CREATE INDEX usertaskstats_task_count_idx ON analytics_usertaskstats (task_count DESC, user_id)',
+    'CREATE INDEX usertaskstats_completion_idx ON analytics_usertaskstats (completion_rate DESC, user_id)',
+    f'INSERT INTO analytics_usertaskstats {USER_TASK_STATS_SELECT}',
+]
+TABLE_BACKWARD = [
+    'DROP TABLE IF EXISTS analytics_usertaskstats',
+]
+
+
+def create_stats(apps, schema_editor):
+    statements = POSTGRESQL_FORWARD if schema_editor.connection.vendor == 'postgresql' else TABLE_FORWARD
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_stats(apps, schema_editor):
+    statements = POSTGRESQL_BACKWARD if schema_editor.connection.vendor == 'postgresql' else TABLE_BACKWARD
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('tasks', '0006_tasktombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskStats',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='task_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('task_count', models.IntegerField()),
+                ('completed_count', models.IntegerField()),
+                ('pending_count', models.IntegerField()),
+                ('completion_rate', models.FloatField()),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'analytics_usertaskstats',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_stats, drop_stats),
+    ]
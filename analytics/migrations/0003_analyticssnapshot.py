@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-17 00:59
+
+import analytics.models
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_usertaskstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('data', models.JSONField(decoder=analytics.models.SnapshotDecoder, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('computed_at', models.DateTimeField()),
+                ('duration', models.FloatField(help_text='Seconds spent computing the snapshot')),
+            ],
+        ),
+    ]
@@ -1,8 +1,251 @@
-# Analytics app models for monitoring existing Task and User data
-# This app focuses on providing read-only analytics views for admins
-# using PostgreSQL aggregation on existing models rather than storing separate analytics data
+# Analytics app models for monitoring existing Task and User data.
+# Charts read from DailyTaskRollup, which task writes keep up to date, so
+# that they never have to aggregate the whole task table. The user listings
+# read from UserTaskStats, a snapshot refreshed on a schedule, and the
+# dashboards from AnalyticsSnapshot rows.
 
-from django.db import models
+import json
+from collections import defaultdict
+from datetime import datetime, time, timedelta
 
-# No models needed - we use direct PostgreSQL aggregation 
-# on existing Task and User models for real-time analytics
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import Count, F, IntegerField, Sum, Value
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from tasks.models import Task, UserTaskState
+
+User = get_user_model()
+
+
+def rollup_day(value):
+    """Return the day a timestamp falls on in the rollups, in TIME_ZONE"""
+    return timezone.localtime(value, timezone.get_default_timezone()).date()
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_default_timezone())
+
+
+def count_task_days(tasks, start=None, end=None):
+    """
+    Count ``tasks`` per (user_id, day) on the days in [start, end), as
+    {(user_id, day): [created, completed]}. Works on historical models too.
+    """
+    def grouped(queryset, column, counted):
+        if start is not None:
+            queryset = queryset.filter(**{f'{column}__gte': day_start(start)})
+        if end is not None:
+            queryset = queryset.filter(**{f'{column}__lt': day_start(end)})
+        # Both halves of the UNION select the same columns in the same order
+        counts = {
+            name: Count('id') if name == counted else Value(0, output_field=IntegerField())
+            for name in ('created', 'completed')
+        }
+        return queryset.annotate(
+            day=TruncDate(column, tzinfo=timezone.get_default_timezone())
+        ).values('user_id', 'day').annotate(**counts).order_by()
+
+    created = grouped(tasks, 'created_at', 'created')
+    completed = grouped(tasks.filter(completed=True), 'updated_at', 'completed')
+    counts = defaultdict(lambda: [0, 0])
+    for row in created.union(completed, all=True):
+        key = row['user_id'], row['day']
+        counts[key][0] += row['created']
+        counts[key][1] += row['completed']
+    return counts
+
+
+class DailyTaskRollup(models.Model):
+    """
+    Task activity per user and day (in TIME_ZONE), kept up to date by every
+    task write: tasks created, tasks completed and the net change in pending
+    tasks, which also counts reopened and deleted tasks. Summed over all
+    days, ``pending_delta`` is the user's number of pending tasks.
+
+    Rebuilding recounts the tasks as they are now, taking the last update of
+    a completed task as its completion, so it forgets deleted tasks and
+    completions that were undone. Rebuilding a range of days then puts what
+    the other days no longer account for of each user's pending tasks, as
+    counted by UserTaskState, on the last day of the range.
+    """
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_task_rollups')
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    pending_delta = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the access path of the day-range reads of the charts
+            models.UniqueConstraint(fields=['day', 'user'], name='rollup_day_user_unique'),
+        ]
+
+    def __str__(self):
+        return f'Tasks of user {self.user_id} on {self.day}'
+
+    @classmethod
+    def adjust(cls, deltas):
+        """
+        Apply {(user_id, day): [created, completed, pending_delta]} deltas,
+        one UPDATE per day; missing rows are created first.
+        """
+        for (user_id, day), (created, completed, pending_delta) in deltas.items():
+            if not (created or completed or pending_delta):
+                continue
+            changes = {
+                'created': F('created') + created,
+                'completed': F('completed') + completed,
+                'pending_delta': F('pending_delta') + pending_delta,
+            }
+            rows = cls.objects.filter(user_id=user_id, day=day)
+            if not rows.update(**changes):
+                cls.objects.bulk_create([cls(user_id=user_id, day=day)], ignore_conflicts=True)
+                rows.update(**changes)
+
+    @classmethod
+    def rebuild(cls, user_ids=None, start=None, end=None):
+        """
+        Recount the days in [start, end) of the given users (default: all)
+        from the task table and replace their rollups.
+        """
+        tasks = Task.objects.all()
+        rollups = cls.objects.all()
+        if user_ids is not None:
+            tasks = tasks.filter(user_id__in=user_ids)
+            rollups = rollups.filter(user_id__in=user_ids)
+        if start is not None:
+            rollups = rollups.filter(day__gte=start)
+        if end is not None:
+            rollups = rollups.filter(day__lt=end)
+
+        with transaction.atomic():
+            rollups.delete()
+            rebuilt = cls.objects.bulk_create([
+                cls(user_id=user_id, day=day, created=created, completed=completed, pending_delta=created - completed)
+                for (user_id, day), (created, completed) in count_task_days(tasks, start, end).items()
+            ], batch_size=1000)
+            if start is not None or end is not None:
+                # Days outside the range still hold the +1 of tasks deleted
+                # or reopened since, whose -1 was in the range
+                cls.balance_pending(user_ids, end - timedelta(days=1) if end is not None else timezone.localdate())
+            return rebuilt
+
+    @classmethod
+    def balance_pending(cls, user_ids, day):
+        """
+        Adjust ``pending_delta`` on ``day`` so that every user's sum over all
+        days is their number of pending tasks in UserTaskState again.
+        """
+        rollups = cls.objects.all()
+        states = UserTaskState.objects.all()
+        if user_ids is not None:
+            rollups = rollups.filter(user_id__in=user_ids)
+            states = states.filter(user_id__in=user_ids)
+        stored = dict(rollups.values('user_id').annotate(pending=Sum('pending_delta')).values_list('user_id', 'pending'))
+        pending = dict(states.values_list('user_id', F('task_count') - F('completed_count')))
+        cls.adjust({
+            (user_id, day): [0, 0, pending.get(user_id, 0) - stored.get(user_id, 0)]
+            for user_id in stored.keys() | pending.keys()
+        })
+
+
+# Per-user statistics, completion rate included, for every user. The columns
+# are listed in the order of the UserTaskStats fields.
+USER_TASK_STATS_SELECT = """
+    SELECT
+        u.id AS user_id,
+        COALESCE(s.task_count, 0) AS task_count,
+        COALESCE(s.completed_count, 0) AS completed_count,
+        COALESCE(s.task_count, 0) - COALESCE(s.completed_count, 0) AS pending_count,
+        CAST(CASE WHEN s.task_count > 0
+            THEN ROUND(s.completed_count * 100.0 / s.task_count, 2)
+            ELSE 0 END AS DOUBLE PRECISION) AS completion_rate,
+        CURRENT_TIMESTAMP AS refreshed_at
+    FROM users_customuser u
+    LEFT JOIN tasks_usertaskstate s ON s.user_id = u.id
+"""
+
+
+class UserTaskStats(models.Model):
+    """
+    Snapshot of every user's task counts and completion rate, for listings
+    that sort and page users by them. On PostgreSQL it is a materialized
+    view, elsewhere a plain table; refresh() recomputes it from the per-user
+    task counters, so it lags task writes until the next refresh. Users
+    created since then have no row.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.DO_NOTHING, primary_key=True, related_name='task_stats', db_constraint=False
+    )
+    task_count = models.IntegerField()
+    completed_count = models.IntegerField()
+    pending_count = models.IntegerField()
+    completion_rate = models.FloatField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'analytics_usertaskstats'
+
+    def __str__(self):
+        return f'Task stats of user {self.user_id}'
+
+    @classmethod
+    def refresh(cls):
+        """Recompute the snapshot; reads keep seeing the previous one meanwhile"""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Needs the unique index on user_id, and does not block reads
+                cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {table}')
+            else:
+                cursor.execute(f'DELETE FROM {table}')
+                cursor.execute(f'INSERT INTO {table} {USER_TASK_STATS_SELECT}')
+
+    @classmethod
+    def freshness(cls):
+        """
+        When the snapshot was taken, and whether that is longer ago than
+        USER_STATS_MAX_AGE seconds.
+        """
+        refreshed_at = cls.objects.values_list('refreshed_at', flat=True).first()
+        stale = (
+            refreshed_at is None
+            or timezone.now() - refreshed_at > timedelta(seconds=settings.USER_STATS_MAX_AGE)
+        )
+        return {'refreshed_at': refreshed_at, 'stale': stale}
+
+
+class SnapshotDecoder(json.JSONDecoder):
+    """Decode the timestamps (keys ending in _at) that DjangoJSONEncoder wrote as strings"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs['object_hook'] = self.revive
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def revive(obj):
+        for key, value in obj.items():
+            if key.endswith('_at') and isinstance(value, str):
+                obj[key] = parse_datetime(value) or value
+        return obj
+
+
+class AnalyticsSnapshot(models.Model):
+    """
+    The last computed copy of an analytics snapshot (see analytics.snapshots)
+    and how long computing it took. The background jobs keep these current,
+    so their computed_at and duration are also the jobs' health.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder, decoder=SnapshotDecoder)
+    computed_at = models.DateTimeField()
+    duration = models.FloatField(help_text='Seconds spent computing the snapshot')
+
+    def __str__(self):
+        return f'Analytics snapshot {self.name}'
@@ -0,0 +1,10 @@
+from tasks.pagination import TaskKeysetPagination
+
+
+class UserStatsPagination(TaskKeysetPagination):
+    """
+    Keyset pagination over the users with their statistics, in the order of
+    user_stats_queryset, whose user id tie-breaker keeps every key unique.
+    """
+    page_size = 100
+    max_page_size = 1000
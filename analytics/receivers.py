@@ -0,0 +1,110 @@
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.receivers import deleted_with_user
+from tasks.signals import tasks_created, tasks_deleted, tasks_status_changed, tasks_updated
+
+from .models import DailyTaskRollup, rollup_day
+
+
+def new_deltas():
+    # [created, completed, pending_delta] per (user_id, day)
+    return defaultdict(lambda: [0, 0, 0])
+
+
+def count_created(deltas, task):
+    counts = deltas[task.user_id, rollup_day(task.created_at or timezone.now())]
+    counts[0] += 1
+    counts[1 if task.completed else 2] += 1
+
+
+def count_status_change(deltas, user_id, day, completed):
+    counts = deltas[user_id, day]
+    if completed:
+        counts[1] += 1
+        counts[2] -= 1
+    else:
+        counts[2] += 1
+
+
+@receiver(pre_save, sender=Task)
+def remember_rollup_state(sender, instance, raw=False, **kwargs):
+    # The loaded values are replaced once the task is saved, so keep the
+    # owner and status the save starts from
+    if raw or instance._state.adding:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if 'user_id' in loaded and 'completed' in loaded:
+        instance._rollup_state = loaded['user_id'], loaded['completed']
+    else:
+        instance._rollup_state = Task.objects.filter(pk=instance.pk).values_list('user_id', 'completed').first()
+
+
+@receiver(post_save, sender=Task)
+def roll_up_saved_task(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = new_deltas()
+    previous = instance.__dict__.pop('_rollup_state', None)
+    if created or previous is None:
+        count_created(deltas, instance)
+    else:
+        user_id, completed = previous
+        day = rollup_day(timezone.now())
+        if user_id != instance.user_id:
+            # A change of owner moves the task's pending count along
+            deltas[user_id, day][2] -= int(not completed)
+            deltas[instance.user_id, day][2] += int(not completed)
+        if completed != instance.completed:
+            count_status_change(deltas, instance.user_id, day, instance.completed)
+    DailyTaskRollup.adjust(deltas)
+
+
+@receiver(post_delete, sender=Task)
+def roll_up_deleted_task(sender, instance, origin=None, **kwargs):
+    # The user's rollups are removed by the same cascade
+    if not deleted_with_user(origin) and not instance.completed:
+        deltas = new_deltas()
+        deltas[instance.user_id, rollup_day(timezone.now())][2] -= 1
+        DailyTaskRollup.adjust(deltas)
+
+
+@receiver(tasks_deleted, sender=Task)
+def roll_up_deleted_tasks(sender, tasks, **kwargs):
+    deltas = new_deltas()
+    day = rollup_day(timezone.now())
+    for task in tasks:
+        deltas[task.user_id, day][2] -= int(not task.completed)
+    DailyTaskRollup.adjust(deltas)
+
+
+@receiver(tasks_created, sender=Task)
+def roll_up_created_tasks(sender, tasks, **kwargs):
+    deltas = new_deltas()
+    for task in tasks:
+        count_created(deltas, task)
+    DailyTaskRollup.adjust(deltas)
+
+
+@receiver(tasks_status_changed, sender=Task)
+def roll_up_status_changes(sender, tasks, **kwargs):
+    deltas = new_deltas()
+    for task in tasks:
+        count_status_change(deltas, task.user_id, rollup_day(task.updated_at), task.completed)
+    DailyTaskRollup.adjust(deltas)
+
+
+@receiver(tasks_updated, sender=Task)
+def roll_up_updated_tasks(sender, user_ids, values, **kwargs):
+    # Which tasks changed is unknown, so recount the users' days
+    if not values.keys() & {'created_at', 'completed', 'user', 'user_id'}:
+        return
+    user_ids = set(user_ids)
+    if 'user' in values or 'user_id' in values:
+        owner = values.get('user_id', values.get('user'))
+        user_ids.add(getattr(owner, 'pk', owner))
+    DailyTaskRollup.rebuild(user_ids)
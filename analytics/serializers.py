@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+
+class UserStatsSerializer(serializers.Serializer):
+    """Serializer for a user with their task statistics"""
+    id = serializers.IntegerField()
+    email = serializers.EmailField()
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
+    role = serializers.CharField()
+    date_joined = serializers.DateTimeField()
+    task_count = serializers.IntegerField()
+    completed_count = serializers.IntegerField()
+    pending_count = serializers.IntegerField()
+    completion_rate = serializers.FloatField()
+
+
+class UserStatsPageSerializer(serializers.Serializer):
+    """Serializer for a page of user statistics and the age of the snapshot behind it"""
+    refreshed_at = serializers.DateTimeField(allow_null=True)
+    stale = serializers.BooleanField()
+    next = serializers.URLField(allow_null=True)
+    previous = serializers.URLField(allow_null=True)
+    results = UserStatsSerializer(many=True)
@@ -0,0 +1,279 @@
+"""
+Analytics snapshots: statistics computed once, stored for every view that
+shows them, and served stale while they are recomputed.
+
+Snapshots are stored in AnalyticsSnapshot rows, with a copy in the
+analytics cache. A snapshot is fresh for ANALYTICS_SNAPSHOT_TTL seconds.
+
+With ANALYTICS_BACKGROUND_JOBS on, the jobs in analytics.tasks recompute
+every snapshot on a schedule and requests only read what they stored.
+Otherwise the first request to take an expired snapshot's lock recomputes
+it, while the others keep getting the stale copy for up to
+ANALYTICS_SNAPSHOT_STALE_TTL more seconds. Requests that find no usable copy
+wait up to ANALYTICS_SNAPSHOT_WAIT seconds for the lock holder instead of all
+computing it at once.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from tasks.models import Task
+
+from . import timeseries
+from .models import AnalyticsSnapshot, UserTaskStats
+from .utils import USER_STATS_ORDERINGS, task_counts, task_totals
+
+User = get_user_model()
+
+# Rows kept of the top users and recent tasks; views show a prefix of them
+TOP_USERS = 10
+RECENT_TASKS = 10
+TASK_ANALYTICS_USERS = 100
+TASK_ANALYTICS_TASKS = 100
+
+# Days of daily counts kept in the series snapshot
+SERIES_DAYS = 366
+SERIES_MONTHS = 12
+
+POLL_INTERVAL = 0.1
+
+
+def completion_rate(totals):
+    if totals['total'] > 0:
+        return round(totals['completed'] / totals['total'] * 100, 2)
+    return 0
+
+
+def recent_tasks(count, *fields):
+    """The latest tasks, shaped like tasks for the templates, which read task.user.email"""
+    return [
+        {**task, 'user': {'email': task.pop('user__email')}}
+        for task in Task.objects.order_by('-created_at').values(*fields, 'user__email')[:count]
+    ]
+
+
+def build_dashboard():
+    """Overall task and user statistics, the top users, recent tasks and the last week"""
+    totals = task_totals()
+    users = User.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(task_state__task_count__gt=0))
+    )
+    top_users = User.objects.annotate(
+        **task_counts()
+    ).filter(task_count__gt=0).order_by('-task_count').values(
+        'email', 'first_name', 'last_name', 'task_count', 'completed_count', 'pending_count', 'completion_rate'
+    )[:TOP_USERS]
+
+    return {
+        'total_tasks': totals['total'],
+        'completed_tasks': totals['completed'],
+        'pending_tasks': totals['pending'],
+        'total_users': users['total_users'],
+        'active_users': users['active_users'],
+        'completion_rate': completion_rate(totals),
+        'top_users': list(top_users),
+        'recent_tasks': recent_tasks(RECENT_TASKS, 'title', 'completed', 'created_at'),
+        'daily_stats': timeseries.daily_stats(7),
+    }
+
+
+def build_task_analytics():
+    """Task totals, the users with the most tasks, the latest tasks and the last months"""
+    totals = task_totals()
+    tasks_by_user = User.objects.annotate(
+        **task_counts(completed='completed_tasks', pending='pending_tasks')
+    ).filter(task_count__gt=0).order_by('-task_count').values(
+        'email', 'first_name', 'last_name', 'task_count', 'completed_tasks', 'pending_tasks', 'completion_rate'
+    )[:TASK_ANALYTICS_USERS]
+
+    return {
+        'total': totals['total'],
+        'completed_count': totals['completed'],
+        'pending_count': totals['pending'],
+        'completion_rate': completion_rate(totals),
+        'tasks_by_user': list(tasks_by_user),
+        'recent_tasks': recent_tasks(
+            TASK_ANALYTICS_TASKS, 'title', 'description', 'completed', 'created_at', 'updated_at'
+        ),
+        'monthly_stats': timeseries.monthly_stats(6),
+    }
+
+
+def build_user_analytics():
+    """Refresh the per-user statistics that the user analytics API pages through"""
+    UserTaskStats.refresh()
+    return {'users': UserTaskStats.objects.count()}
+
+
+def build_series():
+    """Daily and monthly created and completed counts, for api_daily_stats and charts"""
+    return {
+        'daily': timeseries.daily_stats(SERIES_DAYS),
+        'monthly': timeseries.monthly_stats(SERIES_MONTHS),
+    }
+
+
+SNAPSHOTS = {
+    'dashboard': build_dashboard,
+    'tasks': build_task_analytics,
+    'users': build_user_analytics,
+    'series': build_series,
+}
+
+
+def get_cache():
+    return caches[settings.ANALYTICS_CACHE_ALIAS]
+
+
+def snapshot_key(name):
+    return f'analytics:snapshot:{name}'
+
+
+def make_entry(data, computed_at):
+    return {
+        'data': data,
+        'computed_at': computed_at,
+        'fresh_until': computed_at.timestamp() + settings.ANALYTICS_SNAPSHOT_TTL,
+    }
+
+
+def cache_entry(name, entry):
+    get_cache().set(
+        snapshot_key(name), entry,
+        timeout=settings.ANALYTICS_SNAPSHOT_TTL + settings.ANALYTICS_SNAPSHOT_STALE_TTL
+    )
+
+
+def refresh_snapshot(name):
+    """Compute the snapshot now and store it, whatever is stored"""
+    computed_at = timezone.now()
+    started = time.monotonic()
+    data = SNAPSHOTS[name]()
+    AnalyticsSnapshot.objects.update_or_create(name=name, defaults={
+        'data': data,
+        'computed_at': computed_at,
+        'duration': time.monotonic() - started,
+    })
+    entry = make_entry(data, computed_at)
+    cache_entry(name, entry)
+    return entry
+
+
+def cached_snapshot(name):
+    """Return the cached snapshot entry, or None if it is not cached"""
+    return get_cache().get(snapshot_key(name))
+
+
+def load_snapshot(name):
+    """Return the stored snapshot entry, or None if there is none"""
+    entry = cached_snapshot(name)
+    if entry is None:
+        stored = AnalyticsSnapshot.objects.filter(name=name).values_list('data', 'computed_at').first()
+        if stored is not None:
+            entry = make_entry(*stored)
+            cache_entry(name, entry)
+    return entry
+
+
+def usable(entry):
+    """Whether a stored entry may be served, fresh or stale"""
+    if entry is None:
+        return False
+    if settings.ANALYTICS_BACKGROUND_JOBS:
+        return True
+    return entry['fresh_until'] + settings.ANALYTICS_SNAPSHOT_STALE_TTL > time.time()
+
+
+def get_snapshot(name):
+    """
+    Return the snapshot as {'data', 'computed_at', 'stale'}, recomputing it
+    if it has expired, unless background jobs do that or another request is
+    already doing so.
+    """
+    entry = load_snapshot(name)
+    expired = entry is None or entry['fresh_until'] <= time.time()
+    if expired and not (settings.ANALYTICS_BACKGROUND_JOBS and entry is not None):
+        cache = get_cache()
+        lock_key = f'{snapshot_key(name)}:lock'
+        if cache.add(lock_key, True, timeout=settings.ANALYTICS_SNAPSHOT_LOCK_TTL):
+            try:
+                entry = refresh_snapshot(name)
+            finally:
+                cache.delete(lock_key)
+        elif not usable(entry):
+            deadline = time.monotonic() + settings.ANALYTICS_SNAPSHOT_WAIT
+            # Poll the cache only: the lock holder caches the snapshot once
+            # its row is written, and reading the table while it is being
+            # written fails on SQLite
+            while not usable(entry) and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                entry = cached_snapshot(name)
+            if not usable(entry):
+                # The lock holder is taking too long or died
+                entry = refresh_snapshot(name)
+    return {
+        'data': entry['data'],
+        'computed_at': entry['computed_at'],
+        'stale': entry['fresh_until'] <= time.time(),
+    }
+
+
+def user_stats_freshness():
+    """
+    UserTaskStats.freshness(), refreshing the per-user statistics first
+    through the users snapshot when they are stale, so that listings stay
+    current without the worker or a cron job.
+    """
+    freshness = UserTaskStats.freshness()
+    if freshness['stale']:
+        get_snapshot('users')
+        freshness = UserTaskStats.freshness()
+    return freshness
+
+
+def user_analytics_context():
+    """Template context of the user analytics pages, which page through api_user_stats"""
+    return {
+        'stats_freshness': user_stats_freshness(),
+        'orderings': USER_STATS_ORDERINGS,
+        'roles': User.ROLE_CHOICES,
+    }
+
+
+def refresh_snapshots():
+    """Recompute every snapshot, e.g. after a bulk import"""
+    for name in SNAPSHOTS:
+        refresh_snapshot(name)
+
+
+def job_health():
+    """
+    Last run, duration and lag of the job behind every snapshot. The lag is
+    how long past ANALYTICS_JOB_INTERVAL the last run is, so anything above
+    zero means the jobs are not keeping up.
+    """
+    runs = {
+        run.name: run
+        for run in AnalyticsSnapshot.objects.only('name', 'computed_at', 'duration')
+    }
+    now = timezone.now()
+    interval = timedelta(seconds=settings.ANALYTICS_JOB_INTERVAL)
+    health = []
+    for name in SNAPSHOTS:
+        run = runs.get(name)
+        if run is None:
+            health.append({'name': name, 'last_run': None, 'duration': None, 'lag': None})
+            continue
+        health.append({
+            'name': name,
+            'last_run': run.computed_at,
+            'duration': round(run.duration, 3),
+            'lag': max(0, round((now - run.computed_at - interval).total_seconds())),
+        })
+    return health
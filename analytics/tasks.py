@@ -0,0 +1,28 @@
+"""
+Background jobs of django-background-tasks that precompute the analytics
+snapshots, run by the run_analytics_worker command.
+"""
+from background_task import background
+from django.conf import settings
+
+from .snapshots import SNAPSHOTS, refresh_snapshot
+
+
+@background(queue=settings.ANALYTICS_JOB_QUEUE)
+def precompute_snapshot(name):
+    refresh_snapshot(name)
+
+
+def schedule_jobs():
+    """
+    Schedule a job per snapshot that runs now and then every
+    ANALYTICS_JOB_INTERVAL seconds, replacing the jobs already scheduled.
+    """
+    for name in SNAPSHOTS:
+        precompute_snapshot(
+            name,
+            schedule=0,
+            repeat=settings.ANALYTICS_JOB_INTERVAL,
+            remove_existing_tasks=True,
+            verbose_name=f'Precompute the {name} analytics snapshot',
+        )
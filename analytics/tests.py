@@ -1,3 +1,452 @@
-from django.test import TestCase
+import io
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from background_task.models import Task as BackgroundTask
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Q
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from tasks.models import Task
+from tasks.tests import QueryPlanAssertionsMixin
+
+from . import snapshots, timeseries, views
+from .models import AnalyticsSnapshot, DailyTaskRollup, UserTaskStats
+from .utils import day_range, task_counts, user_stats_queryset
+
+User = get_user_model()
+
+
+class AnalyticsQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed_tasks()
+        cls.admin = User.objects.create_user(
+            email='analytics-admin@example.com', password=None, is_staff=True
+        )
+
+    def test_daily_stats_queries(self):
+        request = APIRequestFactory().get('/analytics/api/daily-stats/', {'days': 3})
+        force_authenticate(request, user=self.admin)
+        with CaptureQueriesContext(connection) as captured:
+            response = views.api_daily_stats(request)
+        self.assertEqual(response.status_code, 200)
+        # Served from the daily rollups without touching the task table
+        self.assertFalse([query for query in captured if self.table in query['sql']])
+
+    def test_series_query(self):
+        start, end = timeseries.recent_range(3, 'day')
+        with CaptureQueriesContext(connection) as captured:
+            timeseries.task_series(start, end)
+        self.assertQueriesUseIndex(captured)
+
+    def test_monthly_range_query(self):
+        month_start = timezone.now().date().replace(day=1)
+        range_start, _ = day_range(month_start)
+        _, range_end = day_range(timezone.now().date())
+        with CaptureQueriesContext(connection) as captured:
+            Task.objects.filter(
+                created_at__gte=range_start,
+                created_at__lt=range_end
+            ).aggregate(
+                created_count=Count('id'),
+                completed_count=Count('id', filter=Q(
+                    completed=True,
+                    updated_at__gte=range_start,
+                    updated_at__lt=range_end
+                ))
+            )
+        self.assertQueriesUseIndex(captured)
+
+    def test_recent_tasks_query(self):
+        self.assertQuerysetUsesIndex(
+            Task.objects.select_related('user').order_by('-created_at')[:10]
+        )
+
+    def test_completed_by_day_query(self):
+        start, end = day_range(timezone.now().date() - timedelta(days=1))
+        self.assertQuerysetUsesIndex(
+            Task.objects.filter(completed=True, updated_at__gte=start, updated_at__lt=end).values('id')
+        )
+
+
+class TimeSeriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='series@example.com', password=None)
+        cls.admin = User.objects.create_user(email='series-admin@example.com', password=None, is_staff=True)
+
+    def create_task(self, created_at, completed_at=None):
+        task = Task.objects.create(user=self.user, title='Series', completed=completed_at is not None)
+        Task.objects.filter(pk=task.pk).update(created_at=created_at, updated_at=completed_at or created_at)
+
+    def test_buckets(self):
+        utc = dt_timezone.utc
+        # 19:30 UTC on March 31 is already April 1 in Tashkent (UTC+5)
+        self.create_task(datetime(2026, 3, 31, 19, 30, tzinfo=utc), datetime(2026, 4, 2, 12, tzinfo=utc))
+        self.create_task(datetime(2026, 3, 31, 18, 30, tzinfo=utc))
+        self.create_task(datetime(2026, 1, 10, tzinfo=utc))
+
+        start = datetime(2026, 1, 15, tzinfo=utc)
+        end = datetime(2026, 4, 30, tzinfo=utc)
+        with self.assertNumQueries(1):
+            months = timeseries.task_series(start, end, 'month')
+        self.assertEqual(
+            [(row['start'].strftime('%Y-%m-%d'), row['created'], row['completed']) for row in months],
+            [('2026-01-01', 1, 0), ('2026-02-01', 0, 0), ('2026-03-01', 1, 0), ('2026-04-01', 1, 1)]
+        )
+
+        days = timeseries.task_series(datetime(2026, 3, 31, tzinfo=utc), datetime(2026, 4, 2, 20, tzinfo=utc))
+        self.assertEqual(
+            [(row['start'].strftime('%Y-%m-%d'), row['created'], row['completed']) for row in days],
+            [('2026-03-31', 1, 0), ('2026-04-01', 1, 0), ('2026-04-02', 0, 1), ('2026-04-03', 0, 0)]
+        )
+        weeks = timeseries.task_series(datetime(2026, 3, 31, tzinfo=utc), datetime(2026, 4, 2, tzinfo=utc), 'week')
+        self.assertEqual([(row['start'].strftime('%Y-%m-%d'), row['created']) for row in weeks], [('2026-03-30', 2)])
+
+    def test_recent_days(self):
+        self.create_task(timezone.now() - timedelta(days=2))
+        stats = timeseries.daily_stats(7)
+        self.assertEqual(len(stats), 7)
+        self.assertEqual(stats[-1]['date'], timezone.localdate().strftime('%Y-%m-%d'))
+        self.assertEqual([day['created'] for day in stats], [0, 0, 0, 0, 1, 0, 0])
+
+    def test_daily_stats_days_bounded(self):
+        for days in ('3650', '0', 'week'):
+            request = APIRequestFactory().get('/analytics/api/daily-stats/', {'days': days})
+            force_authenticate(request, user=self.admin)
+            self.assertEqual(views.api_daily_stats(request).status_code, 400)
+
+
+class DailyTaskRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rollup@example.com', password=None)
+        cls.other = User.objects.create_user(email='rollup-other@example.com', password=None)
+
+    def stored(self):
+        return {
+            (row.user_id, row.day): (row.created, row.completed, row.pending_delta)
+            for row in DailyTaskRollup.objects.all()
+        }
+
+    def today(self, user):
+        row = DailyTaskRollup.objects.get(user=user, day=timezone.localdate())
+        return row.created, row.completed, row.pending_delta
+
+    def assertPendingAddsUp(self):
+        for user in (self.user, self.other):
+            self.assertEqual(
+                sum(DailyTaskRollup.objects.filter(user=user).values_list('pending_delta', flat=True)),
+                Task.objects.filter(user=user, completed=False).count()
+            )
+
+    def test_writes_keep_rollups(self):
+        task = Task.objects.create(user=self.user, title='Rolled up')
+        steps = [
+            (lambda: None, (1, 0, 1)),
+            (lambda: Task.objects.filter(pk=task.pk).set_completed(True), (1, 1, 0)),
+            # Reopening keeps the completion but counts the task as pending again
+            (lambda: Task.objects.filter(pk=task.pk).set_completed(False), (1, 1, 1)),
+            (lambda: Task.objects.create(user=self.user, title='Done', completed=True), (2, 2, 1)),
+            (lambda: Task.objects.filter(user=self.user).set_completed(None), (2, 3, 1)),
+            (lambda: Task.objects.get(title='Done').delete(), (2, 3, 0)),
+        ]
+        for step, today in steps:
+            step()
+            self.assertEqual(self.today(self.user), today)
+            self.assertPendingAddsUp()
+
+        # Saves of loaded tasks, including a change of owner
+        task = Task.objects.get(pk=task.pk)
+        task.completed = False
+        task.save()
+        self.assertEqual(self.today(self.user), (2, 3, 1))
+        task.user = self.other
+        task.save()
+        self.assertEqual((self.today(self.user), self.today(self.other)), ((2, 3, 0), (0, 0, 1)))
+
+        Task.objects.bulk_create([Task(user=self.other, title=f'Bulk {n}') for n in range(3)])
+        self.assertEqual(self.today(self.other), (3, 0, 4))
+        Task.objects.filter(user=self.other).update(completed=True)
+        self.assertPendingAddsUp()
+
+    def test_rebuild_command(self):
+        Task.objects.create(user=self.user, title='Old')
+        Task.objects.filter(user=self.user).update(created_at=timezone.now() - timedelta(days=40))
+        Task.objects.create(user=self.other, title='New', completed=True)
+        expected = self.stored()
+        DailyTaskRollup.objects.update(created=0, completed=5)
+        call_command('rebuild_task_rollups', chunk_days=7, stdout=io.StringIO())
+        self.assertEqual(self.stored(), expected)
+
+    def test_rebuild_command_after_deletes(self):
+        old = Task.objects.create(user=self.user, title='Old')
+        Task.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40))
+        DailyTaskRollup.objects.filter(user=self.user).update(day=timezone.localdate() - timedelta(days=40))
+        reopened = Task.objects.create(user=self.user, title='Reopened', completed=True)
+        Task.objects.filter(pk=reopened.pk).set_completed(False)
+        Task.objects.create(user=self.other, title='Deleted').delete()
+        old.delete()
+        call_command('rebuild_task_rollups', start=timezone.localdate() - timedelta(days=7), stdout=io.StringIO())
+        self.assertPendingAddsUp()
+        # The default range starts at the oldest remaining task
+        call_command('rebuild_task_rollups', stdout=io.StringIO())
+        self.assertPendingAddsUp()
+
+    def test_series_from_rollups(self):
+        for days_ago in (0, 2, 2, 9):
+            task = Task.objects.create(user=self.user, title='Series', completed=days_ago == 2)
+            stamp = timezone.now() - timedelta(days=days_ago)
+            Task.objects.filter(pk=task.pk).update(created_at=stamp, updated_at=stamp)
+        for granularity, count in (('day', 10), ('week', 3), ('month', 2)):
+            start, end = timeseries.recent_range(count, granularity)
+            with self.assertNumQueries(1):
+                series = timeseries.rollup_series(start, end, granularity)
+            self.assertEqual(series, timeseries.task_series(start, end, granularity))
+
+
+class UserTaskStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='stats-admin@example.com', password=None, is_staff=True)
+        cls.busy = User.objects.create_user(email='stats-busy@example.com', password=None)
+        cls.idle = User.objects.create_user(email='stats-idle@example.com', password=None)
+        for completed in (True, True, False):
+            Task.objects.create(user=cls.busy, title='Counted', completed=completed)
+        Task.objects.create(user=cls.idle, title='Counted')
+
+    def get(self, view, url='/analytics/api/user-stats/', **params):
+        request = APIRequestFactory().get(url, params)
+        force_authenticate(request, user=self.admin)
+        return view(request)
+
+    def user_stats(self, url='/analytics/api/user-stats/', **params):
+        return self.get(views.api_user_stats, url, **params).data
+
+    def setUp(self):
+        snapshots.get_cache().clear()
+
+    def test_refresh(self):
+        # Listings refresh a stale snapshot through the users snapshot, so
+        # counts show up without the worker or a manual refresh
+        self.assertTrue(UserTaskStats.freshness()['stale'])
+        data = self.user_stats()
+        self.assertFalse(data['stale'])
+        self.assertEqual(
+            [(row['email'], row['task_count'], row['pending_count'], row['completion_rate']) for row in data['results']],
+            [
+                ('stats-busy@example.com', 3, 1, 66.67),
+                ('stats-idle@example.com', 1, 1, 0),
+                ('stats-admin@example.com', 0, 0, 0),
+            ]
+        )
+        # A fresh snapshot is read without touching the task table
+        with CaptureQueriesContext(connection) as captured:
+            self.user_stats()
+        self.assertFalse(any('tasks_task' in query['sql'] for query in captured.captured_queries))
+        # Users who joined since the refresh are listed with no tasks yet
+        User.objects.create_user(email='stats-new@example.com', password=None)
+        self.assertEqual(
+            [(row['email'], row['task_count']) for row in self.user_stats(ordering='-date_joined')['results'][:1]],
+            [('stats-new@example.com', 0)]
+        )
+
+        self.client.force_login(User.objects.create_superuser(email='stats-root@example.com', password=None))
+        response = self.client.get('/analytics-admin/users/customuser/')
+        counts = {user.email: user.task_count_annotated for user in response.context['cl'].result_list}
+        self.assertEqual((counts['stats-busy@example.com'], counts['stats-idle@example.com']), (3, 1))
+
+    @override_settings(ANALYTICS_BACKGROUND_JOBS=True)
+    def test_refresh_left_to_jobs(self):
+        snapshots.refresh_snapshot('users')
+        UserTaskStats.objects.update(refreshed_at=timezone.now() - timedelta(days=1))
+        snapshots.get_cache().clear()
+        AnalyticsSnapshot.objects.update(computed_at=timezone.now() - timedelta(days=1))
+        # Requests serve the stale snapshot and leave refreshing it to the jobs
+        data = self.user_stats()
+        self.assertTrue(data['stale'])
+        self.assertEqual(data['results'][0]['task_count'], 3)
+
+    def test_completion_rate_ordering(self):
+        UserTaskStats.refresh()
+        top = User.objects.annotate(**task_counts()).order_by('-completion_rate')[:1]
+        self.assertEqual([user.completion_rate for user in top], [66.67])
+
+    def test_pages(self):
+        for n in range(4):
+            User.objects.create_user(email=f'stats-extra-{n}@example.com', password=None)
+        UserTaskStats.refresh()
+        for ordering in ('-task_count', 'task_count', '-completion_rate', 'completion_rate', '-date_joined', 'date_joined'):
+            expected = [row.id for row in user_stats_queryset({'ordering': ordering})]
+            seen = []
+            data = self.user_stats(ordering=ordering, page_size=2)
+            while True:
+                seen += [row['id'] for row in data['results']]
+                if not data['next']:
+                    break
+                data = self.user_stats(data['next'])
+            self.assertEqual(seen, expected, ordering)
+            # And back again
+            seen = [row['id'] for row in data['results']]
+            while data['previous']:
+                data = self.user_stats(data['previous'])
+                seen = [row['id'] for row in data['results']] + seen
+            self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        UserTaskStats.refresh()
+        self.assertEqual([row['email'] for row in self.user_stats(role='admin')['results']], [])
+        Task.objects.filter(user=self.idle).update(created_at=timezone.now() - timedelta(days=30))
+        DailyTaskRollup.rebuild([self.idle.pk])
+        self.assertEqual(
+            [row['email'] for row in self.user_stats(active_days=7)['results']],
+            ['stats-busy@example.com']
+        )
+        self.assertEqual(len(self.user_stats(active_days=31)['results']), 2)
+        for params in ({'ordering': 'email'}, {'role': 'owner'}, {'active_days': '0'}):
+            self.assertEqual(self.get(views.api_user_stats, **params).status_code, 400)
+
+    def test_export(self):
+        UserTaskStats.refresh()
+        response = self.get(views.api_user_stats_export, '/analytics/api/user-stats/export/', ordering='completion_rate')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'email'])
+        # Ties are broken by the user id
+        self.assertEqual(
+            [line.split(',')[1] for line in lines[1:]],
+            ['stats-admin@example.com', 'stats-idle@example.com', 'stats-busy@example.com']
+        )
+
+
+class AnalyticsSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email='snapshot-admin@example.com', password=None, is_staff=True)
+        Task.objects.create(user=cls.admin, title='Snapshot', completed=True)
+
+    def setUp(self):
+        snapshots.get_cache().clear()
+
+    def test_views_share_snapshot(self):
+        request = APIRequestFactory().get('/analytics/api/dashboard-stats/')
+        force_authenticate(request, user=self.admin)
+        self.assertEqual(views.api_dashboard_stats(request).data['completed_tasks'], 1)
+        Task.objects.create(user=self.admin, title='Not counted yet')
+
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(2):  # session and user
+            summary = self.client.get('/analytics/api/summary/').json()
+        self.assertEqual(summary['overview']['total_tasks'], 1)
+        self.assertEqual(summary['recent_activity'][0]['user__email'], self.admin.email)
+
+        # The admin action recomputes it right away
+        self.client.post('/analytics-admin/refresh/')
+        self.assertEqual(self.client.get('/analytics/api/summary/').json()['overview']['total_tasks'], 2)
+
+    def test_stored_snapshot(self):
+        snapshots.refresh_snapshot('tasks')
+        snapshots.get_cache().clear()
+        # Read back from the database, timestamps included
+        stats = snapshots.get_snapshot('tasks')['data']
+        self.assertEqual(stats['recent_tasks'][0]['user']['email'], self.admin.email)
+        self.assertIsInstance(stats['recent_tasks'][0]['created_at'], datetime)
+
+
+class AnalyticsSnapshotJobTests(TransactionTestCase):
+
+    def setUp(self):
+        snapshots.get_cache().clear()
+        self.builds = 0
+
+    def slow_build(self):
+        self.builds += 1
+        time.sleep(0.2)
+        return {'build': self.builds}
+
+    def concurrently(self, read, count=5):
+        barrier = threading.Barrier(count)
+        results = []
+
+        def run():
+            barrier.wait()
+            try:
+                results.append(read())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_stale_while_revalidate(self):
+        with mock.patch.dict(snapshots.SNAPSHOTS, {'dashboard': self.slow_build}):
+            entry = snapshots.refresh_snapshot('dashboard')
+            entry['fresh_until'] = time.time() - 1
+            snapshots.get_cache().set(snapshots.snapshot_key('dashboard'), entry)
+            results = self.concurrently(lambda: snapshots.get_snapshot('dashboard'))
+
+        # One request recomputed the expired snapshot; the others got the old one
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(sorted(result['data']['build'] for result in results), [1, 1, 1, 1, 2])
+        self.assertTrue(all(result['stale'] for result in results if result['data']['build'] == 1))
+
+    def test_cold_start_computes_once(self):
+        waiting = set()
+        all_waiting = threading.Event()
+        cached_snapshot = snapshots.cached_snapshot
+
+        def poll(name):
+            waiting.add(threading.get_ident())
+            if len(waiting) == 4:
+                all_waiting.set()
+            return cached_snapshot(name)
+
+        def build():
+            # Only finish once every other request is polling for the result
+            self.assertTrue(all_waiting.wait(5))
+            return self.slow_build()
+
+        with mock.patch.dict(snapshots.SNAPSHOTS, {'dashboard': build}), \
+                mock.patch.object(snapshots, 'cached_snapshot', poll):
+            results = [result['data'] for result in self.concurrently(lambda: snapshots.get_snapshot('dashboard'))]
+
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(results, [{'build': 1}] * 5)
+
+    @override_settings(ANALYTICS_BACKGROUND_JOBS=True)
+    def test_background_jobs_refresh(self):
+        with mock.patch.dict(snapshots.SNAPSHOTS, {'dashboard': self.slow_build}):
+            snapshots.refresh_snapshot('dashboard')
+            AnalyticsSnapshot.objects.update(computed_at=timezone.now() - timedelta(hours=1))
+            snapshots.get_cache().clear()
+            # Requests leave an expired snapshot to the jobs
+            snapshot = snapshots.get_snapshot('dashboard')
+        self.assertEqual((snapshot['data'], snapshot['stale'], self.builds), ({'build': 1}, True, 1))
+        self.assertGreater(snapshots.job_health()[0]['lag'], 0)
+
+    def test_worker(self):
+        call_command('run_analytics_worker', duration=1, sleep=0.1, stdout=io.StringIO())
+        self.assertEqual(
+            sorted(AnalyticsSnapshot.objects.values_list('name', flat=True)),
+            sorted(snapshots.SNAPSHOTS)
+        )
+        self.assertTrue(all(job['lag'] == 0 for job in snapshots.job_health()))
+        # Every job is scheduled to run again
+        self.assertEqual(BackgroundTask.objects.filter(queue=settings.ANALYTICS_JOB_QUEUE).count(), len(snapshots.SNAPSHOTS))
@@ -0,0 +1,163 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DateField, F, IntegerField, Sum, Value
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from tasks.models import Task
+
+from .models import DailyTaskRollup
+
+GRANULARITIES = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Longest series a single call may build
+MAX_BUCKETS = 1000
+
+
+def truncate(value, granularity):
+    """Return the start of the bucket holding the naive local datetime ``value``"""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'hour':
+        return value
+    value = value.replace(hour=0)
+    if granularity == 'week':
+        # Weeks start on Monday, as in TruncWeek
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def shift(value, granularity, steps):
+    """Move the naive bucket start ``value`` by ``steps`` buckets"""
+    if granularity == 'month':
+        month = value.year * 12 + value.month - 1 + steps
+        return value.replace(year=month // 12, month=month % 12 + 1)
+    if granularity == 'week':
+        return value + timedelta(weeks=steps)
+    if granularity == 'day':
+        return value + timedelta(days=steps)
+    return value + timedelta(hours=steps)
+
+
+def bucket_starts(start, end, granularity):
+    """
+    Return the aware starts of the buckets overlapping [start, end), in the
+    current timezone. Buckets are stepped on the local calendar, so days and
+    months keep their boundaries across offset changes.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unknown granularity {granularity!r}')
+    tz = timezone.get_current_timezone()
+    local_end = timezone.make_naive(end, tz)
+    bucket = truncate(timezone.make_naive(start, tz), granularity)
+    starts = []
+    while bucket < local_end:
+        if len(starts) == MAX_BUCKETS:
+            raise ValueError(f'A series is limited to {MAX_BUCKETS} buckets')
+        starts.append(timezone.make_aware(bucket, tz))
+        bucket = shift(bucket, granularity, 1)
+    return starts
+
+
+def recent_range(count, granularity):
+    """Return the [start, end) range of the last ``count`` buckets, the current one included"""
+    tz = timezone.get_current_timezone()
+    current = truncate(timezone.localtime(timezone.now(), tz).replace(tzinfo=None), granularity)
+    start = timezone.make_aware(shift(current, granularity, 1 - count), tz)
+    end = timezone.make_aware(shift(current, granularity, 1), tz)
+    return start, end
+
+
+def grouped_counts(tasks, column, start, end, granularity, counted):
+    """Count the tasks per bucket of ``column``, reported under ``counted``"""
+    # Both halves of the UNION select the same columns in the same order
+    counts = {
+        name: Count('id') if name == counted else Value(0, output_field=IntegerField())
+        for name in ('created', 'completed')
+    }
+    return tasks.filter(
+        **{f'{column}__gte': start, f'{column}__lt': end}
+    ).annotate(
+        bucket=GRANULARITIES[granularity](column, tzinfo=timezone.get_current_timezone())
+    ).values('bucket').annotate(**counts).order_by()
+
+
+def task_series(start, end, granularity='day', tasks=None):
+    """
+    Return the number of tasks created and completed in every bucket
+    overlapping [start, end), oldest first, with empty buckets reported as
+    zeros. A task counts as completed in the bucket of its last update.
+
+    Both counts come from one query: a GROUP BY over each timestamp, joined
+    with UNION ALL. The filters are plain range comparisons, so they are
+    served by the created_at and partial updated_at indexes.
+    """
+    starts = bucket_starts(start, end, granularity)
+    if not starts:
+        return []
+    start = starts[0]
+    tasks = Task.objects.all() if tasks is None else tasks
+    created = grouped_counts(tasks, 'created_at', start, end, granularity, 'created')
+    completed = grouped_counts(tasks.filter(completed=True), 'updated_at', start, end, granularity, 'completed')
+
+    counts = {bucket: {'created': 0, 'completed': 0} for bucket in starts}
+    for row in created.union(completed, all=True):
+        bucket = counts[row['bucket']]
+        bucket['created'] += row['created']
+        bucket['completed'] += row['completed']
+    return [{'start': bucket, **counts[bucket]} for bucket in starts]
+
+
+def rollup_series(start, end, granularity='day'):
+    """
+    Same as task_series, for days, weeks and months, read from the daily
+    rollups: the cost grows with the days in the range, not with the tasks.
+    """
+    if granularity == 'hour':
+        raise ValueError('The rollups hold whole days')
+    starts = bucket_starts(start, end, granularity)
+    if not starts:
+        return []
+    tz = timezone.get_current_timezone()
+    local_end = timezone.make_naive(end, tz)
+    days = DailyTaskRollup.objects.filter(day__gte=timezone.localdate(starts[0], tz))
+    if local_end.time() == time.min:
+        days = days.filter(day__lt=local_end.date())
+    else:
+        days = days.filter(day__lte=local_end.date())
+    bucket = F('day') if granularity == 'day' else GRANULARITIES[granularity]('day', output_field=DateField())
+    rows = days.annotate(bucket=bucket).values('bucket').annotate(
+        created_count=Sum('created'), completed_count=Sum('completed')
+    ).order_by()
+
+    counts = {
+        timezone.make_aware(datetime.combine(row['bucket'], time.min), tz): (row['created_count'], row['completed_count'])
+        for row in rows
+    }
+    series = []
+    for bucket in starts:
+        created, completed = counts.get(bucket, (0, 0))
+        series.append({'start': bucket, 'created': created, 'completed': completed})
+    return series
+
+
+def daily_stats(days):
+    """Created and completed counts for the last ``days`` days, today included"""
+    return [
+        {'date': row['start'].strftime('%Y-%m-%d'), 'created': row['created'], 'completed': row['completed']}
+        for row in rollup_series(*recent_range(days, 'day'), 'day')
+    ]
+
+
+def monthly_stats(months):
+    """Created and completed counts for the last ``months`` calendar months, this one included"""
+    return [
+        {'month': row['start'].strftime('%Y-%m'), 'created': row['created'], 'completed': row['completed']}
+        for row in rollup_series(*recent_range(months, 'month'), 'month')
+    ]
@@ -6,5 +6,7 @@ app_name = 'analytics'
 urlpatterns = [
     # API endpoints for analytics data
     path('api/dashboard-stats/', views.api_dashboard_stats, name='api_dashboard_stats'),
+    path('api/user-stats/', views.api_user_stats, name='api_user_stats'),
+    path('api/user-stats/export/', views.api_user_stats_export, name='api_user_stats_export'),
     path('api/summary/', views.analytics_summary_json, name='analytics_summary_json'),
 ]
@@ -0,0 +1,101 @@
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from tasks.models import UserTaskState
+
+from .models import DailyTaskRollup
+
+User = get_user_model()
+
+# Sort keys of the user statistics listing
+USER_STATS_ORDERINGS = ('task_count', 'completion_rate', 'date_joined')
+
+
+def day_range(date):
+    """
+    Return the half-open [start, end) datetimes covering ``date`` in the
+    current timezone.
+
+    Filtering on ``created_at__gte=start, created_at__lt=end`` selects the same
+    rows as ``created_at__date=date`` but can be served by an index on the
+    column, whereas the ``__date`` cast cannot.
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def task_counts(total='task_count', completed='completed_count', pending='pending_count', rate='completion_rate'):
+    """
+    User annotations for total, completed and pending task counts and the
+    completion rate, read from the per-user statistics snapshot
+    (UserTaskStats) so that listings sort and slice users in the database.
+    Users missing from the snapshot count as having no tasks.
+    """
+    return {
+        total: Coalesce(F('task_stats__task_count'), 0),
+        completed: Coalesce(F('task_stats__completed_count'), 0),
+        pending: Coalesce(F('task_stats__pending_count'), 0),
+        rate: Coalesce(F('task_stats__completion_rate'), 0.0),
+    }
+
+
+def task_totals():
+    """
+    Total, completed and pending task counts, summed from the per-user task
+    counters instead of counted over the whole task table.
+    """
+    totals = UserTaskState.objects.aggregate(
+        total=Coalesce(Sum('task_count'), 0),
+        completed=Coalesce(Sum('completed_count'), 0),
+    )
+    totals['pending'] = totals['total'] - totals['completed']
+    return totals
+
+
+def user_stats_queryset(params):
+    """
+    Every user with their statistics from the per-user snapshot, filtered
+    and sorted by the query parameters, ties broken by the user id. Users
+    created since the last refresh are listed with no tasks.
+
+    - ``ordering``: task_count, completion_rate or date_joined, prefixed
+      with - for descending (default: -task_count)
+    - ``role``: only users with this role
+    - ``active_days``: only users with task activity (tasks created,
+      completed or reopened) in the last N days, today included
+
+    Raises ValueError with a message for invalid parameters.
+    """
+    ordering = params.get('ordering', '-task_count')
+    if ordering.lstrip('-') not in USER_STATS_ORDERINGS:
+        raise ValueError(f"ordering must be one of: {', '.join(USER_STATS_ORDERINGS)} (prefix with - for descending)")
+
+    stats = User.objects.annotate(**task_counts()).order_by(
+        ordering, '-id' if ordering.startswith('-') else 'id'
+    )
+
+    role = params.get('role')
+    if role:
+        if role not in dict(User.ROLE_CHOICES):
+            raise ValueError(f"role must be one of: {', '.join(dict(User.ROLE_CHOICES))}")
+        stats = stats.filter(role=role)
+
+    active_days = params.get('active_days')
+    if active_days:
+        try:
+            active_days = int(active_days)
+        except ValueError:
+            active_days = 0
+        if active_days < 1:
+            raise ValueError('active_days must be a positive number')
+        since = timezone.localdate() - timedelta(days=active_days - 1)
+        stats = stats.filter(Exists(
+            DailyTaskRollup.objects.filter(user_id=OuterRef('pk'), day__gte=since)
+        ))
+    return stats
@@ -2,6 +2,7 @@
 ASGI config for application project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Long-lived responses such as the task event stream are only served here.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -9,8 +10,22 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings')
+# Use the same logic as wsgi.py to determine settings module
+if os.environ.get('DJANGO_ENV') == 'production':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings.production')
+else:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings.local')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # Serve static files in development, as runserver does
+    application = ASGIStaticFilesHandler(application)
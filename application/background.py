@@ -0,0 +1,6 @@
+from background_task.apps import BackgroundTasksAppConfig
+
+
+class BackgroundTasksConfig(BackgroundTasksAppConfig):
+    """django-background-tasks, keeping the id fields its migrations create"""
+    default_auto_field = 'django.db.models.AutoField'
@@ -0,0 +1,34 @@
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser that decodes with orjson. Bodies orjson rejects are parsed
+    again by the stock parser, so errors are reported exactly as before.
+    Integers wider than 64 bits are read as floats.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+
+        try:
+            if encoding.lower().replace('-', '') == 'utf8':
+                return orjson.loads(body)
+            return orjson.loads(body.decode(encoding))
+        except (orjson.JSONDecodeError, UnicodeDecodeError):
+            pass
+
+        try:
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(body.decode(encoding), parse_constant=parse_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
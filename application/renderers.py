@@ -0,0 +1,33 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson.
+
+    Datetimes, dates, times and UUIDs are encoded natively; everything else
+    orjson does not know (Decimals, lazy translation strings, timedeltas,
+    querysets, ...) goes through DRF's encoder, so the output matches the stock
+    renderer byte for byte. The exceptions are very large or small floats,
+    written in orjson's notation, and NaN/Infinity, written as null.
+
+    Indented, ASCII-only or non-compact output and data orjson rejects, such
+    as integers wider than 64 bits or non-string keys, are left to the stock
+    renderer.
+    """
+    options = orjson.OPT_UTC_Z
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like the stock renderer does, so the output is valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'application',
     "django_filters",
     'corsheaders',
+    'application.background.BackgroundTasksConfig',
 ]
 
 MIDDLEWARE = [
@@ -91,11 +92,13 @@ WSGI_APPLICATION = 'application.wsgi.application'
 # }
 
 REST_FRAMEWORK = {
+    # orjson-backed drop-in replacements for DRF's JSONRenderer and JSONParser;
+    # switch back to the rest_framework classes to use the stdlib json module
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer"
+        "application.renderers.ORJSONRenderer"
     ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "application.parsers.ORJSONParser",
         "rest_framework.parsers.FormParser",
         "rest_framework.parsers.MultiPartParser",
     ],
@@ -117,6 +120,8 @@ REST_FRAMEWORK = {
         "password_reset": "3/min",  # Password reset: 3 per min per IP
         "task_create": "100/min",   # Task creation: 100 per min per user
         "task_update": "200/min",   # Task updates: 200 per min per user
+        "task_export": "10/min",    # Full task exports: 10 per min per user
+        "task_import": "10/hour",   # File imports: 10 per hour per user
         "burst": "60/min",           # Burst protection: 60 per minute
         "sustained": "1000/day",     # Daily limit: 1000 per day per user
         "anon_strict": "20/min",    # Strict limits for anonymous users
@@ -248,6 +253,93 @@ MEDIA_URL = '/media/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Delta sync: deleted tasks are reported for this many days, after which
+# sync tokens from before that period expire
+TASK_TOMBSTONE_RETENTION_DAYS = int(os.getenv('TASK_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Broker that fans task events out to the event stream. The in-process
+# broker only reaches streams served by the same process.
+TASK_EVENTS_BROKER = os.getenv('TASK_EVENTS_BROKER', 'tasks.events.InProcessBroker')
+
+# Per-user cache of task list pages, details and statistics. Every task write
+# moves the user's version on, so stale entries are never read; they expire
+# after TASK_CACHE_TTL seconds (0 turns the cache off) or are culled once the
+# cache holds TASK_CACHE_MAX_ENTRIES entries. The in-process default only
+# suits a single process; use a shared backend with several workers.
+TASK_CACHE_ALIAS = 'tasks'
+TASK_CACHE_TTL = int(os.getenv('TASK_CACHE_TTL', 300))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    TASK_CACHE_ALIAS: {
+        'BACKEND': os.getenv('TASK_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('TASK_CACHE_LOCATION', 'tasks'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('TASK_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Serve the task list, detail, status and stats endpoints with async views.
+# Django runs async ORM queries one at a time on a shared thread, so against
+# a slow database the sync views with several workers serve more; measure
+# with the benchmark_task_api command before turning this on.
+TASK_ASYNC_VIEWS = bool(int(os.getenv('TASK_ASYNC_VIEWS', 0)))
+
+# Idempotency-Key support on task writes. The first response to a key is
+# replayed to retries for IDEMPOTENCY_KEY_TTL seconds; retries that arrive
+# while it is still running wait up to IDEMPOTENCY_WAIT seconds for it. The
+# lock on a key expires after IDEMPOTENCY_LOCK_TTL seconds in case its holder
+# dies. As with the task cache, several workers need a shared backend.
+IDEMPOTENCY_CACHE_ALIAS = 'idempotency'
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+IDEMPOTENCY_WAIT = int(os.getenv('IDEMPOTENCY_WAIT', 10))
+IDEMPOTENCY_LOCK_TTL = int(os.getenv('IDEMPOTENCY_LOCK_TTL', 60))
+
+CACHES[IDEMPOTENCY_CACHE_ALIAS] = {
+    'BACKEND': os.getenv('IDEMPOTENCY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+    'LOCATION': os.getenv('IDEMPOTENCY_CACHE_LOCATION', 'idempotency'),
+    'OPTIONS': {
+        'MAX_ENTRIES': int(os.getenv('IDEMPOTENCY_CACHE_MAX_ENTRIES', 100000)),
+    },
+}
+
+# The user analytics pages read per-user statistics from a snapshot that is
+# renewed through the 'users' analytics snapshot once it is older than
+# USER_STATS_MAX_AGE seconds (by the analytics worker when
+# ANALYTICS_BACKGROUND_JOBS is on, otherwise by the request that finds it
+# stale), or right away by the refresh_user_task_stats command.
+USER_STATS_MAX_AGE = int(os.getenv('USER_STATS_MAX_AGE', 15 * 60))
+
+# Dashboard statistics are computed once per ANALYTICS_SNAPSHOT_TTL seconds
+# and cached. An expired snapshot is recomputed by one request while the
+# others get the previous one, for up to ANALYTICS_SNAPSHOT_STALE_TTL more
+# seconds; with nothing cached they wait up to ANALYTICS_SNAPSHOT_WAIT
+# seconds for it. The lock on a recomputation expires after
+# ANALYTICS_SNAPSHOT_LOCK_TTL seconds in case its holder dies.
+ANALYTICS_CACHE_ALIAS = 'analytics'
+ANALYTICS_SNAPSHOT_TTL = int(os.getenv('ANALYTICS_SNAPSHOT_TTL', 60))
+ANALYTICS_SNAPSHOT_STALE_TTL = int(os.getenv('ANALYTICS_SNAPSHOT_STALE_TTL', 15 * 60))
+ANALYTICS_SNAPSHOT_WAIT = int(os.getenv('ANALYTICS_SNAPSHOT_WAIT', 10))
+ANALYTICS_SNAPSHOT_LOCK_TTL = int(os.getenv('ANALYTICS_SNAPSHOT_LOCK_TTL', 60))
+
+CACHES[ANALYTICS_CACHE_ALIAS] = {
+    'BACKEND': os.getenv('ANALYTICS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+    'LOCATION': os.getenv('ANALYTICS_CACHE_LOCATION', 'analytics'),
+}
+
+# With ANALYTICS_BACKGROUND_JOBS on, requests never recompute a snapshot that
+# is stored: the run_analytics_worker command recomputes each one every
+# ANALYTICS_JOB_INTERVAL seconds on the ANALYTICS_JOB_QUEUE queue of
+# django-background-tasks. Snapshots older than ANALYTICS_SNAPSHOT_TTL are
+# still reported as stale, so keep it at least as long as the interval.
+ANALYTICS_BACKGROUND_JOBS = bool(int(os.getenv('ANALYTICS_BACKGROUND_JOBS', 0)))
+ANALYTICS_JOB_INTERVAL = int(os.getenv('ANALYTICS_JOB_INTERVAL', 60))
+ANALYTICS_JOB_QUEUE = 'analytics'
+
+
 CSRF_COOKIE_NAME = "csrftoken"
 CSRF_COOKIE_HTTPONLY = False
 
@@ -278,8 +370,9 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'Access-Control-Allow-Origin']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'Access-Control-Allow-Origin', 'Idempotent-Replayed']
 
 
 
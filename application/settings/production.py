@@ -10,3 +10,32 @@ ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS').split(',')
 
 STATIC_ROOT = os.getenv('DJANGO_STATIC_ROOT')
 MEDIA_ROOT = os.getenv('DJANGO_MEDIA_ROOT')
+
+# Several workers serve the event stream; share events through PostgreSQL
+TASK_EVENTS_BROKER = os.getenv('TASK_EVENTS_BROKER', 'tasks.events.PostgresBroker')
+
+# Workers share the task, idempotency and analytics caches through Redis, a
+# database each. Its incr is atomic, so hit counts and cache versions are not
+# lost between workers, and cache reads and writes cost no database queries
+# nor run inside the writer's transaction. Redis evicts by its maxmemory
+# policy, so the MAX_ENTRIES options of the in-process default are dropped.
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379')
+
+CACHES[TASK_CACHE_ALIAS] = {
+    'BACKEND': os.getenv('TASK_CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+    'LOCATION': os.getenv('TASK_CACHE_LOCATION', f'{REDIS_URL}/1'),
+}
+
+CACHES[IDEMPOTENCY_CACHE_ALIAS] = {
+    'BACKEND': os.getenv('IDEMPOTENCY_CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+    'LOCATION': os.getenv('IDEMPOTENCY_CACHE_LOCATION', f'{REDIS_URL}/2'),
+}
+
+CACHES[ANALYTICS_CACHE_ALIAS] = {
+    'BACKEND': os.getenv('ANALYTICS_CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+    'LOCATION': os.getenv('ANALYTICS_CACHE_LOCATION', f'{REDIS_URL}/3'),
+}
+
+# The analytics_worker service precomputes the snapshots, so requests only
+# serve what it stored; recomputing on request is left to local development
+ANALYTICS_BACKGROUND_JOBS = bool(int(os.getenv('ANALYTICS_BACKGROUND_JOBS', 1)))
@@ -1,4 +1,4 @@
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from rest_framework.throttling import BaseThrottle, UserRateThrottle, AnonRateThrottle
 
 
 class LoginRateThrottle(AnonRateThrottle):
@@ -33,6 +33,62 @@ class TaskCreateRateThrottle(UserRateThrottle):
     scope = 'task_create'
 
 
+class CostRateThrottleMixin:
+    """
+    Charge a request ``get_cost()`` units of the rate instead of one, so that
+    a request doing the work of N requests costs the same as N requests.
+    """
+    def get_cost(self, request, view):
+        return 1
+
+    def has_budget(self, request, view):
+        """Whether the request's cost fits in the rate, without charging it"""
+        self.key = None
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.history = self.cache.get(self.key, [])
+        self.now = self.timer()
+
+        # Drop any requests from the history which have now passed the throttle duration
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+        self.cost = self.get_cost(request, view)
+        return len(self.history) + self.cost <= self.num_requests
+
+    def allow_request(self, request, view):
+        if not self.has_budget(request, view):
+            return self.throttle_failure()
+        if self.key is None:
+            return True
+        return self.throttle_success()
+
+    def throttle_success(self):
+        self.history[:0] = [self.now] * self.cost
+        self.cache.set(self.key, self.history, self.duration)
+        return True
+
+
+class TaskBulkCreateRateThrottle(CostRateThrottleMixin, TaskCreateRateThrottle):
+    """
+    Throttle for bulk task creation.
+    Shares the task creation budget and charges one unit per submitted task,
+    so a batch of N tasks costs the same as N single creates. Requests the
+    view rejects without creating anything, such as oversized batches, cost
+    one unit.
+    """
+    def get_cost(self, request, view):
+        items = request.data
+        limit = getattr(view, 'max_batch_size', None)
+        if not isinstance(items, list) or not items or (limit and len(items) > limit):
+            return 1
+        return len(items)
+
+
 class TaskUpdateRateThrottle(UserRateThrottle):
     """
     Throttle for task updates.
@@ -41,6 +97,74 @@ class TaskUpdateRateThrottle(UserRateThrottle):
     scope = 'task_update'
 
 
+def count_batch_operations(request, view):
+    """Return how many operations of a batch request create and change tasks"""
+    operations = request.data.get('operations') if isinstance(request.data, dict) else None
+    if not isinstance(operations, list):
+        return 0, 0
+    operations = operations[:view.max_batch_size]
+    creates = sum(isinstance(operation, dict) and operation.get('op') == 'create' for operation in operations)
+    return creates, len(operations) - creates
+
+
+class TaskBatchCreateRateThrottle(CostRateThrottleMixin, TaskCreateRateThrottle):
+    """
+    Throttle for the creates of a batch request.
+    Charges one unit of the task creation budget per create operation.
+    """
+    def get_cost(self, request, view):
+        return count_batch_operations(request, view)[0]
+
+
+class TaskBatchUpdateRateThrottle(CostRateThrottleMixin, TaskUpdateRateThrottle):
+    """
+    Throttle for the changes of a batch request.
+    Charges one unit of the task update budget per update, delete or
+    status operation.
+    """
+    def get_cost(self, request, view):
+        return count_batch_operations(request, view)[1]
+
+
+class TaskBatchRateThrottle(BaseThrottle):
+    """
+    Throttle for batch requests.
+    Charges the creates and the changes of a batch to their own budgets, but
+    only once both budgets have room, so a request rejected by one budget
+    costs nothing from the other.
+    """
+    budgets = (TaskBatchCreateRateThrottle, TaskBatchUpdateRateThrottle)
+
+    def allow_request(self, request, view):
+        throttles = [budget() for budget in self.budgets]
+        self.exceeded = [throttle for throttle in throttles if not throttle.has_budget(request, view)]
+        if self.exceeded:
+            return False
+        for throttle in throttles:
+            if throttle.key is not None:
+                throttle.throttle_success()
+        return True
+
+    def wait(self):
+        return max(throttle.wait() for throttle in self.exceeded)
+
+
+class TaskExportRateThrottle(UserRateThrottle):
+    """
+    Throttle for task exports.
+    Each export streams the user's whole task history.
+    """
+    scope = 'task_export'
+
+
+class TaskImportRateThrottle(UserRateThrottle):
+    """
+    Throttle for task imports.
+    Each import can insert an unbounded number of tasks.
+    """
+    scope = 'task_import'
+
+
 class BurstRateThrottle(UserRateThrottle):
     """
     Burst protection throttle.
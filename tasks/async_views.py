@@ -0,0 +1,190 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from application.throttles import BurstRateThrottle, LowSecurityThrottle, TaskUpdateRateThrottle
+from . import views
+from .caching import acached_response
+from .conditional import aconditional_get, atask_detail_validators, atask_list_validators
+from .idempotency import idempotent
+from .models import Task, UserTaskState
+from .serializers import TaskCreateUpdateSerializer, TaskSerializer
+
+
+def same_schema(sync_handler):
+    """Document an async handler like the sync handler it stands in for"""
+    def decorator(handler):
+        handler.kwargs = sync_handler.kwargs
+        return handler
+    return decorator
+
+
+class AsyncAPIViewMixin:
+    """
+    Dispatch to ``async def`` handlers.
+
+    DRF runs authentication, permissions and throttling synchronously, and
+    they may query the database, so ``initial()`` runs in a worker thread.
+    The handlers then query through the async ORM; serialization and
+    exception handling are unchanged.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # OPTIONS and 405 are answered by the inherited sync handlers
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class TaskListCreateView(AsyncAPIViewMixin, views.TaskListCreateView):
+    @same_schema(views.TaskListCreateView.get)
+    async def get(self, request, *args, **kwargs):
+        return await acached_response(request, 'list', lambda: self.aconditional_list(request))
+
+    async def aconditional_list(self, request):
+        return await aconditional_get(request, await atask_list_validators(request), self.alist)
+
+    async def alist(self):
+        # The search filter may look up the search backend once per connection
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        rows = self.get_values_list_serializer()
+        if rows is not None:
+            page = await self.paginator.apaginate_queryset(rows.values_list(queryset), self.request, view=self)
+            return self.get_paginated_response(rows.to_representation(page))
+        page = await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @same_schema(views.TaskListCreateView.post)
+    @idempotent
+    async def post(self, request, *args, **kwargs):
+        serializer = TaskCreateUpdateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        task = Task(user=request.user, **serializer.validated_data)
+        await task.asave()
+        return Response(TaskSerializer(task).data, status=status.HTTP_201_CREATED)
+
+
+class TaskRetrieveUpdateDestroyView(AsyncAPIViewMixin, views.TaskRetrieveUpdateDestroyView):
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            task = await queryset.aget(pk=self.kwargs['pk'])
+        except Task.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, task)
+        return task
+
+    @same_schema(views.TaskRetrieveUpdateDestroyView.get)
+    async def get(self, request, *args, **kwargs):
+        return await acached_response(request, 'detail', lambda: self.aconditional_retrieve(request, kwargs['pk']))
+
+    async def aconditional_retrieve(self, request, pk):
+        return await aconditional_get(request, await atask_detail_validators(request, pk), self.aretrieve)
+
+    async def aretrieve(self):
+        task = await self.aget_object()
+        return Response(self.get_serializer(task).data)
+
+    @same_schema(views.TaskRetrieveUpdateDestroyView.put)
+    @idempotent
+    async def put(self, request, *args, **kwargs):
+        return await self.aupdate(request, partial=False)
+
+    @same_schema(views.TaskRetrieveUpdateDestroyView.patch)
+    @idempotent
+    async def patch(self, request, *args, **kwargs):
+        return await self.aupdate(request, partial=True)
+
+    async def aupdate(self, request, partial):
+        task = await self.aget_object()
+        serializer = TaskCreateUpdateSerializer(task, data=request.data, partial=partial, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        updated_task = await sync_to_async(serializer.save)()
+        updated_task.user = request.user
+        return Response(TaskSerializer(updated_task).data)
+
+    @same_schema(views.TaskRetrieveUpdateDestroyView.delete)
+    @idempotent
+    async def delete(self, request, *args, **kwargs):
+        task = await self.aget_object()
+        await task.adelete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TaskStatusView(AsyncAPIViewMixin, APIView):
+    """Async counterpart of the complete, pending and toggle endpoints"""
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TaskUpdateRateThrottle, BurstRateThrottle]
+    completed = None
+
+    @idempotent
+    async def post(self, request, pk):
+        tasks = Task.objects.filter(pk=pk, user=request.user)
+        changed = await tasks.aset_completed(self.completed)
+        if changed:
+            task = changed[0]
+        else:
+            # Nothing changed: the task is either missing or already in that state
+            task = await tasks.afirst()
+            if task is None:
+                return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+        task.user = request.user
+        return Response(TaskSerializer(task).data)
+
+
+class MarkTaskCompletedView(TaskStatusView):
+    completed = True
+
+    @same_schema(views.mark_task_completed.cls.post)
+    async def post(self, request, pk):
+        return await super().post(request, pk)
+
+
+class MarkTaskPendingView(TaskStatusView):
+    completed = False
+
+    @same_schema(views.mark_task_pending.cls.post)
+    async def post(self, request, pk):
+        return await super().post(request, pk)
+
+
+class ToggleTaskCompletionView(TaskStatusView):
+    @same_schema(views.toggle_task_completion.cls.post)
+    async def post(self, request, pk):
+        return await super().post(request, pk)
+
+
+class TaskStatsView(AsyncAPIViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [LowSecurityThrottle]
+
+    @same_schema(views.task_stats.cls.get)
+    async def get(self, request):
+        return await acached_response(request, 'stats', lambda: self.astats(request))
+
+    async def astats(self, request):
+        return Response(views.task_stats_data(await UserTaskState.afor_user(request.user)))
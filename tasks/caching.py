@@ -0,0 +1,193 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .conditional import conditional_response
+
+CACHED_KINDS = ('list', 'detail', 'stats')
+
+
+def get_cache():
+    return caches[settings.TASK_CACHE_ALIAS]
+
+
+def cache_enabled():
+    return settings.TASK_CACHE_TTL > 0
+
+
+def version_key(user_id):
+    return f'tasks:{user_id}:version'
+
+
+def get_version(cache, user_id):
+    """Return the user's cache version, starting one if there is none"""
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, so that a version evicted from a full cache
+        # never comes back with a number whose entries are still stored
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(user_id):
+    try:
+        get_cache().incr(version_key(user_id))
+    except ValueError:
+        # No version yet, so nothing is cached for the user
+        pass
+
+
+def invalidate_user_cache(user_ids, using=None):
+    """
+    Move the users' cache versions on, orphaning everything cached for them.
+
+    The versions move right away, so later reads in the writing request miss,
+    and again once the transaction commits, since a concurrent request may
+    have cached the data from before the commit in the meantime.
+    """
+    if not cache_enabled():
+        return
+    user_ids = set(user_ids)
+    for user_id in user_ids:
+        bump_version(user_id)
+    transaction.on_commit(lambda: [bump_version(user_id) for user_id in user_ids], using=using)
+
+
+class HitCounter:
+    """
+    Count cache hits and misses per kind of read. Counts are kept in the
+    process and added to totals in the cache now and then, so that counting
+    does not cost a cache write per request.
+    """
+    flush_every = 100
+    flush_interval = 10
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def key(self, kind, outcome):
+        return f'tasks:stats:{kind}:{outcome}'
+
+    def count(self, kind, outcome):
+        with self.lock:
+            self.counts[kind, outcome] += 1
+            due = (
+                sum(self.counts.values()) >= self.flush_every
+                or time.monotonic() - self.flushed_at >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed_at = time.monotonic()
+        cache = get_cache()
+        for (kind, outcome), count in counts.items():
+            key = self.key(kind, outcome)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                if not cache.add(key, count, timeout=None):
+                    cache.incr(key, count)
+
+    def totals(self):
+        """Return the hits, misses and hit rate of every kind of read"""
+        self.flush()
+        cache = get_cache()
+        totals = {}
+        for kind in CACHED_KINDS:
+            hits = cache.get(self.key(kind, 'hits'), 0)
+            misses = cache.get(self.key(kind, 'misses'), 0)
+            totals[kind] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0.0,
+            }
+        return totals
+
+    def reset(self):
+        with self.lock:
+            self.counts = Counter()
+        get_cache().delete_many([
+            self.key(kind, outcome) for kind in CACHED_KINDS for outcome in ('hits', 'misses')
+        ])
+
+
+hit_counter = HitCounter()
+
+
+def entry_key(request, kind, version):
+    path = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return f'tasks:{request.user.pk}:{version}:{kind}:{path}'
+
+
+def to_entry(response):
+    last_modified = response.headers.get('Last-Modified')
+    return {
+        'data': response.data,
+        'etag': response.headers.get('ETag'),
+        'last_modified': parse_http_date_safe(last_modified) if last_modified else None,
+    }
+
+
+def from_entry(request, entry):
+    """Answer the request from a cached entry, honouring its validators"""
+    if entry['etag'] is None and entry['last_modified'] is None:
+        return Response(entry['data'])
+    return conditional_response(
+        request, entry['etag'], entry['last_modified'], lambda: Response(entry['data'])
+    )
+
+
+def lookup(request, kind):
+    """Return the cache key of the request and the entry stored under it"""
+    cache = get_cache()
+    key = entry_key(request, kind, get_version(cache, request.user.pk))
+    entry = cache.get(key)
+    hit_counter.count(kind, 'misses' if entry is None else 'hits')
+    return key, entry
+
+
+def store(key, response):
+    if response.status_code == 200:
+        get_cache().set(key, to_entry(response), settings.TASK_CACHE_TTL)
+    return response
+
+
+def cached_response(request, kind, get_response):
+    """
+    Serve a GET from the user's cache, or build it with ``get_response`` and
+    cache it when it is a 200. Entries keep the response data and its ETag
+    and Last-Modified, so conditional requests are answered from the cache
+    too. Authentication, permissions and throttling have run by now.
+    """
+    if not cache_enabled():
+        return get_response()
+    key, entry = lookup(request, kind)
+    if entry is not None:
+        return from_entry(request, entry)
+    return store(key, get_response())
+
+
+async def acached_response(request, kind, get_response):
+    """Async counterpart of cached_response; ``get_response`` is awaited"""
+    if not cache_enabled():
+        return await get_response()
+    key, entry = await sync_to_async(lookup)(request, kind)
+    if entry is not None:
+        return from_entry(request, entry)
+    return await sync_to_async(store)(key, await get_response())
@@ -0,0 +1,123 @@
+import hashlib
+import time
+from calendar import timegm
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import Task, UserTaskState
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values that determine a response body"""
+    key = '|'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest())
+
+
+def task_list_validators(request):
+    """
+    Return (etag, last_modified) for the user's task list.
+
+    They are derived from the newest ``updated_at``, and the task count and
+    deletion watermark kept in UserTaskState, so any create, update or
+    delete changes them without counting the tasks. The query string is
+    part of the ETag because filters, ordering and cursors change the body.
+    """
+    summary = list_summary(request).aggregate(last_updated=Max('updated_at'))
+    return list_validators(request, summary, list_state(request).first())
+
+
+async def atask_list_validators(request):
+    """Async counterpart of task_list_validators"""
+    summary = await list_summary(request).aaggregate(last_updated=Max('updated_at'))
+    return list_validators(request, summary, await list_state(request).afirst())
+
+
+def list_summary(request):
+    return Task.objects.filter(user=request.user)
+
+
+def list_state(request):
+    return UserTaskState.objects.filter(user=request.user).values_list('task_count', 'last_deleted_at')
+
+
+def list_validators(request, summary, state):
+    count, last_deleted = state or (0, None)
+    etag = make_etag(
+        'list', request.user.pk, summary['last_updated'], count,
+        last_deleted, request.META.get('QUERY_STRING', '')
+    )
+    stamps = [stamp for stamp in (summary['last_updated'], last_deleted) if stamp]
+    return etag, max(stamps) if stamps else None
+
+
+def task_detail_validators(request, pk):
+    """Return (etag, last_modified) for one of the user's tasks"""
+    return detail_validators(request, pk, detail_updated_at(request, pk).first())
+
+
+async def atask_detail_validators(request, pk):
+    """Async counterpart of task_detail_validators"""
+    return detail_validators(request, pk, await detail_updated_at(request, pk).afirst())
+
+
+def detail_updated_at(request, pk):
+    return Task.objects.filter(pk=pk, user=request.user).values_list('updated_at', flat=True)
+
+
+def detail_validators(request, pk, updated_at):
+    if updated_at is None:
+        return None, None
+    etag = make_etag('detail', pk, updated_at, request.META.get('QUERY_STRING', ''))
+    return etag, updated_at
+
+
+def conditional_get(request, validators, get_response):
+    """
+    Answer with 304 Not Modified when the client's copy is current, without
+    calling ``get_response``; otherwise build the full response. Either way
+    the validators are attached so the client can revalidate next time.
+    """
+    return conditional_response(request, validators[0], to_timestamp(validators[1]), get_response)
+
+
+def conditional_response(request, etag, timestamp, get_response):
+    """conditional_get with the last modification as a Unix timestamp"""
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = get_response()
+    return add_validators(response, etag, timestamp)
+
+
+async def aconditional_get(request, validators, get_response):
+    """Async counterpart of conditional_get; ``get_response`` is awaited"""
+    etag, timestamp = validators[0], to_timestamp(validators[1])
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = await get_response()
+    return add_validators(response, etag, timestamp)
+
+
+def to_timestamp(last_modified):
+    """
+    The last modification as a Unix timestamp, or None while it is within
+    the current second. Last-Modified only has one-second precision, so
+    sending it then would answer If-Modified-Since with 304 after another
+    write in the same second; the ETag still validates such responses.
+    """
+    if not last_modified:
+        return None
+    timestamp = timegm(last_modified.utctimetuple())
+    return timestamp if timestamp < int(time.time()) else None
+
+
+def add_validators(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        if etag:
+            response.headers.setdefault('ETag', etag)
+        if timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+    patch_vary_headers(response, ['Authorization'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Sent instead of the events a subscriber missed, telling the client to
+# catch up through the delta sync endpoint.
+RESYNC = {'event': 'resync', 'data': {}}
+
+
+class Subscription:
+    """
+    A consumer of one user's events, bound to the event loop it was created
+    on. Events may be pushed from any thread.
+    """
+    def __init__(self, broker, user_id, maxsize=100):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed; the subscription is about to go away
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Return the next event, or None when ``timeout`` passes first"""
+        if self.overflowed and self.queue.empty():
+            self.overflowed = False
+            return RESYNC
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Fan task events out to the subscribers in this process. Writes served by
+    other processes are not seen, so deployments with several workers need a
+    shared broker such as PostgresBroker.
+    """
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def wants(self, user_id):
+        """Whether events for the user need to be built at all"""
+        return user_id in self._subscribers
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+    def deliver(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.push(event)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Share events between processes with PostgreSQL LISTEN/NOTIFY. Each process
+    listens on one connection from a background thread and hands what it
+    receives to its own subscribers.
+
+    Every process marks the users it has subscribers for in the task cache,
+    and renews the marks from the listener thread, so writes for users nobody
+    is listening to skip the NOTIFY.
+    """
+    channel = 'task_events'
+    # NOTIFY payloads are limited to 8000 bytes
+    max_payload = 7900
+    presence_interval = 30
+    presence_timeout = 90
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        super().__init__()
+        self.using = using
+        self._listener = None
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='task-events', daemon=True)
+                self._listener.start()
+        subscription = super().subscribe(user_id)
+        self._mark_present([user_id])
+        return subscription
+
+    def presence_key(self, user_id):
+        return f'{self.channel}:listening:{user_id}'
+
+    def _mark_present(self, user_ids):
+        if user_ids:
+            caches[settings.TASK_CACHE_ALIAS].set_many(
+                {self.presence_key(user_id): True for user_id in user_ids}, timeout=self.presence_timeout
+            )
+
+    def wants(self, user_id):
+        # Subscribers may live in any process
+        return (
+            super().wants(user_id)
+            or caches[settings.TASK_CACHE_ALIAS].get(self.presence_key(user_id)) is not None
+        )
+
+    def publish(self, user_id, event):
+        payload = json.dumps({'user': user_id, 'event': event}, separators=(',', ':'))
+        if len(payload.encode('utf-8')) > self.max_payload:
+            payload = json.dumps({'user': user_id, 'event': RESYNC}, separators=(',', ':'))
+        with connections[self.using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def _listen(self):
+        import psycopg2
+
+        failed = False
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(**connections[self.using].get_connection_params())
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                if failed:
+                    # Events sent while the listener was down are lost
+                    self._broadcast(RESYNC)
+                    failed = False
+                renew_at = 0
+                while True:
+                    if time.monotonic() >= renew_at:
+                        with self._lock:
+                            user_ids = list(self._subscribers)
+                        self._mark_present(user_ids)
+                        renew_at = time.monotonic() + self.presence_interval
+                    if select.select([connection], [], [], self.presence_interval) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        message = json.loads(connection.notifies.pop(0).payload)
+                        self.deliver(message['user'], message['event'])
+            except Exception:
+                logger.exception('Task event listener failed, reconnecting')
+                failed = True
+                time.sleep(5)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def _broadcast(self, event):
+        with self._lock:
+            user_ids = list(self._subscribers)
+        for user_id in user_ids:
+            self.deliver(user_id, event)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'TASK_EVENTS_BROKER', 'tasks.events.InProcessBroker'))()
+
+
+def publish(user_id, event, data, using=DEFAULT_DB_ALIAS):
+    """
+    Publish a task event for the user once the current transaction commits.
+    ``data`` may be a callable, which is only called if the broker wants the
+    event.
+    """
+    broker = get_broker()
+    if broker.wants(user_id):
+        message = {'event': event, 'data': data() if callable(data) else data}
+        transaction.on_commit(lambda: broker.publish(user_id, message), using=using)
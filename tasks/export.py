@@ -0,0 +1,106 @@
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.text import compress_sequence
+
+from .serializers import TaskSerializer
+
+EXPORT_FIELDS = ('id', 'title', 'description', 'completed', 'created_at', 'updated_at')
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the csv writer"""
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of exported values, chunk by chunk, from a server-side cursor.
+
+    Rows are read as tuples and converted by the serializer fields, so the
+    values match the API representation without building Task instances.
+    """
+    fields = TaskSerializer().fields
+    converters = [fields[name].to_representation for name in EXPORT_FIELDS]
+    chunk = []
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append([convert(value) for convert, value in zip(converters, row)])
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one JSON object per line"""
+    for chunk in export_rows(queryset, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_FIELDS, values)), ensure_ascii=False) + '\n'
+            for values in chunk
+        )
+
+
+def stream_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a header line followed by one line per task"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for chunk in export_rows(queryset, chunk_size):
+        yield ''.join(writer.writerow(values) for values in chunk)
+
+
+EXPORT_FORMATS = {
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    'csv': (stream_csv, 'text/csv'),
+}
+
+
+def accepts_gzip(request):
+    """
+    Whether the request's Accept-Encoding allows gzip: listed with a non-zero
+    quality, or covered by * when not listed itself.
+    """
+    qualities = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    quality = qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0)))
+    return quality > 0
+
+
+def encode_stream(chunks, gzip=False):
+    """Encode the text chunks to UTF-8 and optionally gzip them on the fly"""
+    encoded = (chunk.encode('utf-8') for chunk in chunks)
+    return compress_sequence(encoded) if gzip else encoded
+
+
+async def iterate_async(chunks):
+    """Yield the chunks of a sync iterator, producing each one in the sync thread"""
+    iterator = iter(chunks)
+    done = object()
+    while (chunk := await sync_to_async(next)(iterator, done)) is not done:
+        yield chunk
+
+
+def streaming_content(request, chunks):
+    """
+    The chunks to hand to StreamingHttpResponse. Under ASGI, Django reads a
+    sync iterator to the end before sending anything, so the response gets an
+    async iterator that produces one chunk at a time instead.
+    """
+    if isinstance(request, ASGIRequest):
+        return iterate_async(chunks)
+    return chunks
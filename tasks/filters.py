@@ -0,0 +1,101 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+SEARCH_CONFIG = 'simple'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_FTS_TABLE = 'tasks_task_fts'
+
+
+def search_backend(connection):
+    """
+    Return the full-text backend available on the connection: 'postgresql',
+    'sqlite' when the FTS5 shadow table exists, or None.
+    """
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if not hasattr(connection, '_task_fts'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [SEARCH_FTS_TABLE]
+                )
+                connection._task_fts = cursor.fetchone() is not None
+        if connection._task_fts:
+            return 'sqlite'
+    return None
+
+
+class TaskSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the database's full-text index instead of
+    ``ILIKE '%term%'``: the generated ``search_vector`` column and its GIN
+    index on PostgreSQL, the ``tasks_task_fts`` FTS5 table on SQLite.
+
+    Every word of every search term must prefix-match a word of the title or
+    description, and matches are annotated with ``search_rank`` (higher is more
+    relevant). Other backends fall back to the stock substring search.
+    """
+    rank_annotation = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        words = [
+            word.lower()
+            for term in self.get_search_terms(request)
+            for word in re.findall(r'\w+', term)
+        ]
+        backend = search_backend(connections[queryset.db])
+        if not words or backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        table = queryset.model._meta.db_table
+        if backend == 'postgresql':
+            query = ' & '.join(f'{word}:*' for word in words)
+            tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+            match = RawSQL(
+                f'{table}.{SEARCH_VECTOR_COLUMN} @@ {tsquery}', [query], output_field=BooleanField()
+            )
+            # ts_rank() returns real; widen it in SQL so the value that the
+            # keyset cursor round-trips through JSON compares equal on the
+            # next page.
+            rank = RawSQL(
+                f'ts_rank({table}.{SEARCH_VECTOR_COLUMN}, {tsquery})::double precision',
+                [query],
+                output_field=FloatField()
+            )
+        else:
+            query = ' '.join(f'"{word}"*' for word in words)
+            match = RawSQL(
+                f'{table}.id IN (SELECT rowid FROM {SEARCH_FTS_TABLE} WHERE {SEARCH_FTS_TABLE} MATCH %s)',
+                [query],
+                output_field=BooleanField()
+            )
+            # bm25() is lower for better matches; negate it so both backends
+            # rank in descending order.
+            rank = RawSQL(
+                f'(SELECT -bm25({SEARCH_FTS_TABLE}) FROM {SEARCH_FTS_TABLE} '
+                f'WHERE {SEARCH_FTS_TABLE} MATCH %s AND rowid = {table}.id)',
+                [query],
+                output_field=FloatField()
+            )
+        return queryset.filter(match).annotate(**{self.rank_annotation: rank})
+
+
+class TaskOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter that sorts search results by relevance unless the client
+    picks an explicit ``ordering``, which may also be ``relevance``.
+    """
+    relevance_term = 'relevance'
+
+    def get_ordering(self, request, queryset, view):
+        rank = TaskSearchFilter.rank_annotation
+        if rank in queryset.query.annotations:
+            params = request.query_params.get(self.ordering_param)
+            if not params or params.strip() == self.relevance_term:
+                return ['-' + rank]
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Returned by IdempotentRequest.acquire() while another request holds the key
+WAIT = object()
+
+
+class IdempotentRequest:
+    """
+    A write carrying an ``Idempotency-Key`` header.
+
+    The first response to a (user, key) pair is stored for
+    ``IDEMPOTENCY_KEY_TTL`` seconds and replayed for retries. A lock in the
+    cache makes sure only one request with the key runs at a time; retries
+    that arrive meanwhile wait for its response, for up to
+    ``IDEMPOTENCY_WAIT`` seconds. Reusing a key for a different request is
+    an error.
+    """
+    poll_interval = 0.05
+
+    def __init__(self, request, key):
+        self.cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        scope = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        self.record_key = f'idempotency:{request.user.pk}:{scope}'
+        self.lock_key = f'{self.record_key}:lock'
+        self.fingerprint = self.get_fingerprint(request)
+        self.deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        self.locked = False
+
+    @staticmethod
+    def get_fingerprint(request):
+        data = request.data
+        if hasattr(data, 'lists'):
+            data = dict(data.lists())
+        payload = json.dumps([request.method, request.get_full_path(), data], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def acquire(self):
+        """
+        Return the stored response to replay, WAIT while another request holds
+        the key, or None once this request holds it and should run.
+        """
+        record = self.cache.get(self.record_key)
+        if record is not None:
+            return self.replay(record)
+        if not self.cache.add(self.lock_key, True, timeout=settings.IDEMPOTENCY_LOCK_TTL):
+            return WAIT
+        self.locked = True
+        # The previous holder may have finished between the two lookups
+        record = self.cache.get(self.record_key)
+        if record is not None:
+            self.release()
+            return self.replay(record)
+        return None
+
+    def expired(self):
+        return time.monotonic() >= self.deadline
+
+    def replay(self, record):
+        if record['fingerprint'] != self.fingerprint:
+            return Response(
+                {'error': f'This {IDEMPOTENCY_HEADER} was already used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return Response(record['data'], status=record['status'], headers={'Idempotent-Replayed': 'true'})
+
+    def save(self, response):
+        # Server errors are not stored, so that a retry can succeed
+        if response.status_code < 500:
+            self.cache.set(self.record_key, {
+                'fingerprint': self.fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            }, settings.IDEMPOTENCY_KEY_TTL)
+        return response
+
+    def release(self):
+        if self.locked:
+            self.cache.delete(self.lock_key)
+            self.locked = False
+
+
+def conflict():
+    return Response(
+        {'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed, retry later'},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+def start(args):
+    """
+    Return (IdempotentRequest, None) for a request with a valid key,
+    (None, error response) for an invalid key and (None, None) without one.
+    """
+    request = next(arg for arg in args if isinstance(arg, Request))
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None, None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return None, Response(
+            {'error': f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters long'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return IdempotentRequest(request, key), None
+
+
+def idempotent(handler):
+    """
+    Make a write handler honour the ``Idempotency-Key`` header. Works on
+    view methods and ``@api_view`` functions, sync or async; it goes under
+    the DRF decorators, so the user is authenticated by the time it runs.
+    """
+    if inspect.iscoroutinefunction(handler):
+        @wraps(handler)
+        async def async_wrapper(*args, **kwargs):
+            attempt, error = start(args)
+            if attempt is None:
+                return error or await handler(*args, **kwargs)
+            response = await sync_to_async(attempt.acquire)()
+            while response is WAIT:
+                if attempt.expired():
+                    return conflict()
+                await asyncio.sleep(attempt.poll_interval)
+                response = await sync_to_async(attempt.acquire)()
+            if response is not None:
+                return response
+            try:
+                return await sync_to_async(attempt.save)(await handler(*args, **kwargs))
+            finally:
+                await sync_to_async(attempt.release)()
+        return async_wrapper
+
+    @wraps(handler)
+    def wrapper(*args, **kwargs):
+        attempt, error = start(args)
+        if attempt is None:
+            return error or handler(*args, **kwargs)
+        response = attempt.acquire()
+        while response is WAIT:
+            if attempt.expired():
+                return conflict()
+            time.sleep(attempt.poll_interval)
+            response = attempt.acquire()
+        if response is not None:
+            return response
+        try:
+            return attempt.save(handler(*args, **kwargs))
+        finally:
+            attempt.release()
+    return wrapper
@@ -0,0 +1,148 @@
+import codecs
+import csv
+import io
+import json
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Task
+from .serializers import TaskCreateUpdateSerializer
+from .signals import tasks_created
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def read_ndjson(lines):
+    """
+    Yield (line number, row, error) for every non-blank line of an NDJSON
+    byte stream. Lines that are not valid JSON come with an error instead.
+    """
+    for number, line in enumerate(codecs.iterdecode(lines, 'utf-8-sig'), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError as exc:
+            yield number, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+
+
+def read_csv(lines):
+    """
+    Yield (line number, row, error) for every record of a CSV byte stream
+    with a header line. Quoted values may span lines; the line number is
+    where the record ends. Empty cells count as missing values.
+    """
+    reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+    for record in reader:
+        row = {key: value for key, value in record.items() if key is not None and value not in (None, '')}
+        yield reader.line_num, row, None
+
+
+IMPORT_FORMATS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def guess_format(filename, default='ndjson'):
+    extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if extension in ('jsonl', 'json'):
+        return 'ndjson'
+    return extension if extension in IMPORT_FORMATS else default
+
+
+class TaskImporter:
+    """
+    Validate parsed rows with the ``TaskCreateUpdateSerializer`` rules and
+    insert the valid ones for ``user`` in batches, each in its own
+    transaction: ``COPY`` on PostgreSQL, ``bulk_create`` elsewhere.
+
+    ``run()`` is a generator of events, so callers can report errors and
+    progress as they happen and only one batch is ever held in memory:
+
+    * ``{'event': 'error', 'line': ..., 'errors': {...}}`` for a rejected row
+    * ``{'event': 'progress', 'processed': ..., 'imported': ..., 'failed': ...}`` after each batch
+    * ``{'event': 'done', ...}`` with the final counts, plus ``'error'`` if
+      the file could not be read to the end
+    """
+    def __init__(self, user, batch_size=IMPORT_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+        self.user = user
+        self.batch_size = batch_size
+        self.using = using
+        self.serializer = TaskCreateUpdateSerializer()
+        self.processed = self.imported = self.failed = 0
+
+    def run(self, rows):
+        batch = []
+        fatal = None
+        try:
+            for line, row, errors in rows:
+                self.processed += 1
+                if errors is None:
+                    try:
+                        batch.append(Task(user=self.user, **self.serializer.run_validation(row)))
+                    except serializers.ValidationError as exc:
+                        errors = serializers.as_serializer_error(exc)
+                if errors is not None:
+                    self.failed += 1
+                    yield {'event': 'error', 'line': line, 'errors': errors}
+                if len(batch) >= self.batch_size:
+                    yield self.flush(batch)
+                    batch = []
+        except (UnicodeDecodeError, csv.Error) as exc:
+            fatal = f'Could not read the file after {self.processed} rows: {exc}'
+        if batch:
+            yield self.flush(batch)
+        done = self.progress('done')
+        if fatal:
+            done['error'] = fatal
+        yield done
+
+    def flush(self, tasks):
+        with transaction.atomic(using=self.using):
+            if connections[self.using].vendor == 'postgresql':
+                self.copy(tasks)
+            else:
+                Task.objects.using(self.using).bulk_create(tasks)
+        self.imported += len(tasks)
+        return self.progress('progress')
+
+    def copy(self, tasks):
+        """
+        Stream the batch into the task table with COPY. COPY bypasses the
+        queryset, so stamp the tasks and send ``tasks_created`` here.
+        """
+        now = timezone.now()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        for task in tasks:
+            task.created_at = task.updated_at = now
+            writer.writerow([
+                task.user_id, task.title, task.description,
+                'true' if task.completed else 'false',
+                now.isoformat(), now.isoformat(),
+            ])
+        buffer.seek(0)
+
+        connection = connections[self.using]
+        meta = Task._meta
+        columns = ', '.join(
+            connection.ops.quote_name(meta.get_field(name).column)
+            for name in ('user', 'title', 'description', 'completed', 'created_at', 'updated_at')
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+        tasks_created.send(sender=Task, tasks=tasks, using=self.using)
+
+    def progress(self, event):
+        return {
+            'event': event,
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+        }
@@ -0,0 +1,187 @@
+import asyncio
+import statistics
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.management.commands.benchmark_task_json import throwaway_database
+from tasks.models import Task
+from tasks.urls import async_urlpatterns, sync_urlpatterns
+
+User = get_user_model()
+
+BENCHMARK_EMAIL = 'benchmark@example.com'
+
+ENDPOINTS = {
+    'list': ('get', lambda pk: '/api/tasks/'),
+    'detail': ('get', lambda pk: f'/api/tasks/{pk}/'),
+    'stats': ('get', lambda pk: '/api/tasks/stats/'),
+    'toggle': ('post', lambda pk: f'/api/tasks/{pk}/toggle/'),
+}
+
+
+def task_urlconf(patterns):
+    urlconf = types.ModuleType('benchmark_urls')
+    urlconf.urlpatterns = [path('api/tasks/', include((patterns, 'tasks')))]
+    return urlconf
+
+
+class SlowDatabase:
+    """Add a fixed delay to every query, on current and new connections"""
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        connection_created.connect(self.install)
+        for connection in connections.all(initialized_only=True):
+            self.install(connection)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self.install)
+        for connection in connections.all(initialized_only=True):
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    """
+    Compare the sync and async task views under concurrent load.
+
+    Both stacks run in this process through Django's request handlers: the
+    sync views behind the WSGI handler with a fixed number of worker threads
+    (like gunicorn workers), the async views behind the ASGI handler on one
+    event loop. ``--concurrency`` clients send requests back to back and
+    latency is measured from the moment a client sends a request, so time
+    spent waiting for a free worker counts. ``--latency-ms`` adds a delay to
+    every query to stand in for a slow or remote database.
+
+    It runs against a throwaway test database holding a benchmark user with
+    ``--tasks`` tasks, and throttle rates are lifted for the run.
+    """
+    help = 'Benchmark throughput and latency of the sync and async task API views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and stack (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients (default: 50)')
+        parser.add_argument('--workers', type=int, default=4, help='Worker threads of the sync stack (default: 4)')
+        parser.add_argument('--latency-ms', type=float, default=20, help='Delay added to every query (default: 20)')
+        parser.add_argument('--tasks', type=int, default=200, help='Tasks owned by the benchmark user (default: 200)')
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            choices=list(ENDPOINTS),
+            help='Endpoint to benchmark; repeat for several (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            user = User.objects.create_user(email=BENCHMARK_EMAIL, password=None)
+            Task.objects.bulk_create(
+                Task(user=user, title=f'Benchmark task {number}') for number in range(options['tasks'])
+            )
+            self.task_ids = list(Task.objects.filter(user=user).values_list('pk', flat=True))
+            self.headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+            self.run(options)
+
+    def run(self, options):
+        unthrottled = {scope: None for scope in SimpleRateThrottle.THROTTLE_RATES}
+        self.stdout.write(
+            f"{options['requests']} requests per endpoint, {options['concurrency']} clients, "
+            f"{options['workers']} sync workers, {options['latency_ms']:g} ms per query"
+        )
+        self.stdout.write(f"{'endpoint':<10}{'stack':<7}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, unthrottled), \
+                override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                SlowDatabase(options['latency_ms'] / 1000):
+            for name in options['endpoint'] or ENDPOINTS:
+                for stack, patterns, bench in (
+                    ('sync', sync_urlpatterns, self.bench_sync),
+                    ('async', async_urlpatterns, self.bench_async),
+                ):
+                    with override_settings(ROOT_URLCONF=task_urlconf(patterns)):
+                        result = bench(name, options)
+                    self.stdout.write(
+                        f"{name:<10}{stack:<7}{result['throughput']:>10.1f}"
+                        f"{result['p50']:>10.1f}{result['p99']:>10.1f}"
+                    )
+
+    def requests_for(self, name, options):
+        method, url = ENDPOINTS[name]
+        return [(method, url(self.task_ids[number % len(self.task_ids)])) for number in range(options['requests'])]
+
+    def bench_sync(self, name, options):
+        pending = self.requests_for(name, options)
+        lock = threading.Lock()
+        latencies = []
+
+        def client(workers):
+            session = Client()
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    method, url = pending.pop()
+                started = time.perf_counter()
+                # Requests wait in line for a free worker, like connections in a listen queue
+                response = workers.submit(getattr(session, method), url, headers=self.headers).result()
+                elapsed = time.perf_counter() - started
+                assert response.status_code < 400, response.status_code
+                with lock:
+                    latencies.append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['workers']) as workers, ThreadPoolExecutor(options['concurrency']) as clients:
+            for future in [clients.submit(client, workers) for _ in range(options['concurrency'])]:
+                future.result()
+        return summarize(latencies, time.perf_counter() - started)
+
+    def bench_async(self, name, options):
+        return asyncio.run(self._bench_async(name, options))
+
+    async def _bench_async(self, name, options):
+        pending = self.requests_for(name, options)
+        latencies = []
+
+        async def client():
+            session = AsyncClient()
+            while pending:
+                method, url = pending.pop()
+                started = time.perf_counter()
+                response = await getattr(session, method)(url, headers=self.headers)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code < 400, response.status_code
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+        return summarize(latencies, time.perf_counter() - started)
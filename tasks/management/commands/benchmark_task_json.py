@@ -0,0 +1,104 @@
+import io
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from application.parsers import ORJSONParser
+from application.renderers import ORJSONRenderer
+from tasks.models import Task
+from tasks.serializers import TaskListSerializer
+
+
+def best_of(repeat, func):
+    """Return the median and fastest run time of ``func`` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Point the default database at a test database, created and migrated like
+    the test runner's and destroyed afterwards, so benchmarks that write
+    never touch real data.
+    """
+    test_settings = connections[DEFAULT_DB_ALIAS].settings_dict['TEST']
+    test_name = test_settings['NAME']
+    with tempfile.TemporaryDirectory() as directory:
+        if connections[DEFAULT_DB_ALIAS].vendor == 'sqlite' and not test_name:
+            # Threads lock each other out of an in-memory SQLite database
+            test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        setup_test_environment()
+        try:
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS})
+            try:
+                yield
+            finally:
+                teardown_databases(old_config, verbosity=0)
+        finally:
+            teardown_test_environment()
+            test_settings['NAME'] = test_name
+
+
+class Command(BaseCommand):
+    """
+    Time the stock and orjson JSON renderers and parsers on a task list
+    page of ``TaskListSerializer`` data. The tasks are built in memory, so
+    the database is not involved. The command fails if the two renderers
+    do not produce the same bytes.
+    """
+    help = 'Benchmark the JSON renderers and parsers on task list payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Tasks in the payload (default: 5000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement (default: 20)')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        tasks = [
+            Task(
+                id=number,
+                title=f'Task {number} – ünïcode',
+                completed=number % 3 == 0,
+                created_at=now - timedelta(minutes=number),
+                updated_at=now - timedelta(seconds=number),
+            )
+            for number in range(1, options['rows'] + 1)
+        ]
+        data = {
+            'next': 'http://testserver/api/tasks/?cursor=abc',
+            'previous': None,
+            'results': TaskListSerializer(tasks, many=True).data,
+        }
+
+        stock, fast = JSONRenderer().render(data), ORJSONRenderer().render(data)
+        if stock != fast:
+            raise CommandError('The renderers produced different output')
+        self.stdout.write(f"{options['rows']} tasks, {len(stock)} bytes, median/best of {options['repeat']} runs")
+
+        repeat = options['repeat']
+        rows = [
+            ('render', 'stock', best_of(repeat, lambda: JSONRenderer().render(data))),
+            ('render', 'orjson', best_of(repeat, lambda: ORJSONRenderer().render(data))),
+            ('parse', 'stock', best_of(repeat, lambda: JSONParser().parse(io.BytesIO(stock)))),
+            ('parse', 'orjson', best_of(repeat, lambda: ORJSONParser().parse(io.BytesIO(stock)))),
+        ]
+        self.stdout.write(f"{'':<8}{'':<8}{'median ms':>11}{'best ms':>10}")
+        for step, backend, (median, best) in rows:
+            self.stdout.write(f'{step:<8}{backend:<8}{median:>11.2f}{best:>10.2f}')
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.management.commands.benchmark_task_json import best_of, throwaway_database
+from tasks.models import Task
+from tasks.serializers import TaskListSerializer, ValuesListSerializer
+
+User = get_user_model()
+
+BENCHMARK_EMAIL = 'benchmark-serializer@example.com'
+
+
+class Command(BaseCommand):
+    """
+    Time serializing a task list page from model instances with
+    ``TaskListSerializer`` against the ``values_list()`` fast path, both with
+    and without the query. It runs against a throwaway test database holding
+    a benchmark user with ``--rows`` tasks. The command fails if the outputs
+    differ.
+    """
+    help = 'Benchmark the values_list fast path for task lists against TaskListSerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Tasks to serialize (default: 5000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement (default: 20)')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            user = User.objects.create_user(email=BENCHMARK_EMAIL, password=None)
+            Task.objects.bulk_create(
+                Task(user=user, title=f'Benchmark task {number}', completed=number % 3 == 0)
+                for number in range(options['rows'])
+            )
+            self.run(Task.objects.filter(user=user).order_by('-created_at', '-id'), options['repeat'])
+
+    def run(self, queryset, repeat):
+        rows = ValuesListSerializer(TaskListSerializer())
+        instances = list(queryset)
+        values = list(rows.values_list(queryset))
+        if rows.to_representation(values) != TaskListSerializer(instances, many=True).data:
+            raise CommandError('The fast path produced different output')
+
+        results = [
+            ('query + serialize', 'instances', best_of(repeat, lambda: TaskListSerializer(list(queryset), many=True).data)),
+            ('query + serialize', 'values', best_of(repeat, lambda: rows.to_representation(list(rows.values_list(queryset))))),
+            ('serialize', 'instances', best_of(repeat, lambda: TaskListSerializer(instances, many=True).data)),
+            ('serialize', 'values', best_of(repeat, lambda: rows.to_representation(values))),
+        ]
+        self.stdout.write(f'{len(instances)} tasks, median/best of {repeat} runs')
+        self.stdout.write(f"{'':<19}{'':<11}{'median ms':>11}{'best ms':>10}")
+        for step, path, (median, best) in results:
+            self.stdout.write(f'{step:<19}{path:<11}{median:>11.2f}{best:>10.2f}')
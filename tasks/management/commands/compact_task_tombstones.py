@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from tasks.sync import compact_tombstones
+
+
+class Command(BaseCommand):
+    """
+    Remove the tombstones of tasks deleted longer ago than the retention
+    period. Sync tokens from before the cutoff are answered with 410 Gone.
+    """
+    help = 'Delete task tombstones older than TASK_TOMBSTONE_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help=(
+                'Keep tombstones of the last DAYS days instead of the configured retention; '
+                'less than the retention makes clients with older tokens miss deletions'
+            )
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of tombstones to delete per query (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days']) if options['days'] is not None else None
+        removed = compact_tombstones(older_than=older_than, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} task tombstones'))
@@ -0,0 +1,64 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.imports import IMPORT_BATCH_SIZE, IMPORT_FORMATS, TaskImporter, guess_format
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Load tasks for one user from an NDJSON or CSV file, reading it row by row
+    and inserting valid rows in batches. Rejected rows are reported on stderr
+    and do not stop the import.
+    """
+    help = 'Import tasks for a user from an NDJSON or CSV file ("-" reads stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument('--user', required=True, help='Email of the user who will own the tasks')
+        parser.add_argument(
+            '--type',
+            choices=list(IMPORT_FORMATS),
+            help='File format (default: guessed from the file name, else ndjson)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Number of tasks to insert per transaction (default: {IMPORT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+
+        path = options['path']
+        import_format = options['type'] or guess_format(path)
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+        try:
+            importer = TaskImporter(user, batch_size=options['batch_size'])
+            for event in importer.run(IMPORT_FORMATS[import_format](stream)):
+                if event['event'] == 'error':
+                    self.stderr.write(f'Line {event["line"]}: {event["errors"]}')
+                elif event['event'] == 'progress':
+                    self.stdout.write(
+                        f'Processed {event["processed"]} rows: '
+                        f'{event["imported"]} imported, {event["failed"]} rejected'
+                    )
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        if 'error' in event:
+            raise CommandError(f'{event["error"]} ({event["imported"]} tasks were imported)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {event["imported"]} of {event["processed"]} tasks for {user.email}'
+        ))
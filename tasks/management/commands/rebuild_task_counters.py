@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tasks.models import UserTaskState
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Recount every user's tasks from the task table and compare the result with
+    the denormalized counters in UserTaskState, repairing any drift.
+    """
+    help = 'Rebuild (or with --verify, only check) the per-user task counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report users whose counters are wrong, without fixing them'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users to recount per query (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        mismatched = 0
+
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                stored = {
+                    state.user_id: state
+                    for state in UserTaskState.objects.select_for_update().filter(user_id__in=batch)
+                }
+                counted = UserTaskState.count(batch)
+                wrong = [
+                    state for state in counted
+                    if state.user_id not in stored
+                    or stored[state.user_id].task_count != state.task_count
+                    or stored[state.user_id].completed_count != state.completed_count
+                ]
+                for state in wrong:
+                    current = stored.get(state.user_id)
+                    self.stdout.write(
+                        f'User {state.user_id}: stored '
+                        f'{(current.task_count, current.completed_count) if current else "missing"}, '
+                        f'counted {(state.task_count, state.completed_count)}'
+                    )
+                if wrong and not options['verify']:
+                    UserTaskState.rebuild([state.user_id for state in wrong])
+            mismatched += len(wrong)
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f'Task counters of {len(user_ids)} users are correct'))
+        elif options['verify']:
+            self.stdout.write(self.style.ERROR(f'{mismatched} of {len(user_ids)} users have wrong task counters'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt task counters of {mismatched} users'))
@@ -0,0 +1,136 @@
+from asgiref.sync import sync_to_async
+from django.db import connections, models, transaction
+from django.db.models import F, sql
+from django.utils import timezone
+
+from .signals import tasks_created, tasks_deleted, tasks_status_changed, tasks_updated
+
+
+def supports_update_returning(connection):
+    """
+    Whether the backend can return rows from an UPDATE statement.
+
+    MariaDB can return columns from INSERT but not from UPDATE, so the insert
+    feature flag alone is not enough.
+    """
+    return (
+        connection.vendor in ('postgresql', 'sqlite')
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    Task queryset with set-based status changes, so callers never have to load
+    rows into Python and save them back to change their completion state.
+
+    Bulk writes send the signals in ``tasks.signals`` from within their
+    transaction, since they bypass the model save and delete signals.
+    """
+    delete_batch_size = 1000
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            tasks = super().bulk_create(objs, *args, **kwargs)
+            tasks_created.send(sender=self.model, tasks=tasks, using=self.db)
+        return tasks
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            user_ids = set(self.order_by().values_list('user_id', flat=True).distinct())
+            rows = super().update(**kwargs)
+            tasks_updated.send(sender=self.model, user_ids=user_ids, values=kwargs, using=self.db)
+        return rows
+
+    def delete(self):
+        """
+        Delete the tasks with a DELETE per batch of ids and send tasks_deleted
+        once, instead of the post_delete signal per task, so that the derived
+        data is kept up to date with a few statements per user rather than
+        several per task. Nothing references tasks, so there is no cascade.
+        """
+        if self.query.is_sliced or self.query.combinator or self.query.distinct_fields or self._fields is not None:
+            # Let Django raise its errors for these
+            return super().delete()
+        with transaction.atomic(using=self.db):
+            tasks = list(self.select_for_update().order_by('pk').only('id', 'user_id', 'completed'))
+            base = self.model._base_manager.using(self.db)
+            for start in range(0, len(tasks), self.delete_batch_size):
+                batch = tasks[start:start + self.delete_batch_size]
+                base.filter(pk__in=[task.pk for task in batch])._raw_delete(self.db)
+            if tasks:
+                tasks_deleted.send(sender=self.model, tasks=tasks, using=self.db)
+        return len(tasks), {self.model._meta.label: len(tasks)}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def set_completed(self, completed=None):
+        """
+        Mark every task in the queryset as completed (True), pending (False)
+        or flip each one (None), writing only ``completed`` and ``updated_at``.
+
+        Completing or reopening only touches tasks that are not already in
+        that state. Returns the changed tasks with their new values.
+        """
+        if completed is None:
+            tasks, value = self, ~F('completed')
+        else:
+            tasks, value = self.exclude(completed=completed), completed
+        values = {'completed': value, 'updated_at': timezone.now()}
+
+        with transaction.atomic(using=self.db):
+            if supports_update_returning(connections[self.db]):
+                changed = tasks._update_returning(values)
+            else:
+                changed = tasks._update_then_apply(values, completed)
+            tasks_status_changed.send(sender=self.model, tasks=changed, using=self.db)
+        return changed
+
+    async def aset_completed(self, completed=None):
+        return await sync_to_async(self.set_completed)(completed)
+
+    def _update_returning(self, values):
+        """
+        Run a single UPDATE ... RETURNING and build the tasks from the
+        returned rows.
+        """
+        connection = connections[self.db]
+        query = self.query.chain(sql.UpdateQuery)
+        query.add_update_values(values)
+        query.annotations = {}
+        compiler = query.get_compiler(self.db)
+        compiler.pre_sql_setup()
+        update_sql, params = compiler.as_sql()
+
+        fields = self.model._meta.concrete_fields
+        returning = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(f'{update_sql} RETURNING {returning}', params)
+            rows = cursor.fetchall()
+
+        columns = [field.get_col(self.model._meta.db_table) for field in fields]
+        converters = compiler.get_converters(columns)
+        if converters:
+            rows = compiler.apply_converters(rows, converters)
+        names = [field.attname for field in fields]
+        return [self.model.from_db(self.db, names, row) for row in rows]
+
+    def _update_then_apply(self, values, completed):
+        """
+        Fallback for backends without UPDATE ... RETURNING: lock and read the
+        matching rows, update them with one statement and mirror the change on
+        the loaded instances.
+        """
+        with transaction.atomic(using=self.db):
+            tasks = list(self.select_for_update().order_by('pk'))
+            if not tasks:
+                return []
+            self.model._base_manager.using(self.db).filter(
+                pk__in=[task.pk for task in tasks]
+            ).update(**values)
+        for task in tasks:
+            task.completed = not task.completed if completed is None else completed
+            task.updated_at = values['updated_at']
+            task._loaded_values.update(completed=task.completed, updated_at=task.updated_at)
+        return tasks
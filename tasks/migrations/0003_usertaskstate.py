@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-17 00:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_task_user_created_idx_and_more'),
+        ('users', '0002_customuser_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_state', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_deleted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
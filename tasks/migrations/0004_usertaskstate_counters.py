@@ -0,0 +1,56 @@
+# Generated by Django 5.0.2 on 2026-10-17 00:07
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_task_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Task = apps.get_model('tasks', 'Task')
+    UserTaskState = apps.get_model('tasks', 'UserTaskState')
+
+    counts = {
+        row['user_id']: row
+        for row in Task.objects.order_by().values('user_id').annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(completed=True))
+        )
+    }
+    states = [
+        UserTaskState(
+            user_id=user_id,
+            task_count=counts.get(user_id, {}).get('total', 0),
+            completed_count=counts.get(user_id, {}).get('completed', 0),
+        )
+        for user_id in User.objects.values_list('pk', flat=True)
+    ]
+    UserTaskState.objects.bulk_create(
+        states,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['task_count', 'completed_count']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_usertaskstate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertaskstate',
+            name='completed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usertaskstate',
+            name='task_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+from django.db import migrations
+
+# PostgreSQL keeps a generated tsvector column (title weighted above
+# description) with a GIN index. The 'simple' configuration does no stemming,
+# which suits tasks written in several languages.
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE tasks_task ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX task_search_vector_idx ON tasks_task USING GIN (search_vector)',
+]
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS task_search_vector_idx',
+    'ALTER TABLE tasks_task DROP COLUMN IF EXISTS search_vector',
+]
+
+# SQLite keeps an external-content FTS5 table that triggers hold in sync
+# with tasks_task. Schema changes that make Django rebuild tasks_task drop
+# these triggers, so such migrations must run this again.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE tasks_task_fts USING fts5(
+        title, description,
+        content='tasks_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER tasks_task_fts_insert AFTER INSERT ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_task_fts_delete AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts (tasks_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_task_fts_update AFTER UPDATE OF title, description ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts (tasks_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_task_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO tasks_task_fts (tasks_task_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS tasks_task_fts_insert',
+    'DROP TRIGGER IF EXISTS tasks_task_fts_delete',
+    'DROP TRIGGER IF EXISTS tasks_task_fts_update',
+    'DROP TABLE IF EXISTS tasks_task_fts',
+]
+
+
+def sqlite_has_fts5(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def install_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_FORWARD
+    elif vendor == 'sqlite' and sqlite_has_fts5(schema_editor):
+        statements = SQLITE_FORWARD
+    else:
+        # Other backends keep the substring search.
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def remove_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_usertaskstate_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, remove_search),
+    ]
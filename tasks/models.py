@@ -1,5 +1,10 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+from django.db.models import Count, F, Q
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .managers import TaskQuerySet
 
 User = get_user_model()
 
@@ -13,8 +18,135 @@ class Task(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Per-user list access paths, one per supported ordering; the id
+            # column doubles as the keyset pagination tie-breaker.
+            models.Index(fields=['user', '-created_at', '-id'], name='task_user_created_idx'),
+            models.Index(fields=['user', '-updated_at', '-id'], name='task_user_updated_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='task_user_title_idx'),
+            models.Index(fields=['user', 'completed', '-created_at', '-id'], name='task_user_completed_idx'),
+            # Analytics date-range scans across all users
+            models.Index(fields=['created_at'], name='task_created_idx'),
+            models.Index(fields=['updated_at'], name='task_completed_updated_idx', condition=models.Q(completed=True)),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so that saves can tell what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the per-user counters updated by post_save in the same transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class UserTaskState(models.Model):
+    """
+    Per-user task bookkeeping: denormalized task counters kept up to date by
+    every task write, and change markers that cannot be derived from the
+    remaining task rows, such as when a task was last deleted.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='task_state')
+    task_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    last_deleted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Task state of user {self.user_id}'
+
+    @property
+    def pending_count(self):
+        return self.task_count - self.completed_count
+
+    @property
+    def completion_rate(self):
+        if self.task_count > 0:
+            return round(self.completed_count / self.task_count * 100, 2)
+        return 0
+
+    @classmethod
+    def for_user(cls, user):
+        """Return the user's state, rebuilding it if the row is missing"""
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            return cls.rebuild([user.pk])[0]
+
+    @classmethod
+    async def afor_user(cls, user):
+        try:
+            return await cls.objects.aget(user=user)
+        except cls.DoesNotExist:
+            return (await sync_to_async(cls.rebuild)([user.pk]))[0]
+
+    @classmethod
+    def adjust(cls, user_id, tasks=0, completed=0, **fields):
+        """
+        Apply counter deltas and set ``fields`` with a single UPDATE. A missing
+        row is rebuilt from the task table instead.
+        """
+        updated = cls.objects.filter(user_id=user_id).update(
+            task_count=F('task_count') + tasks,
+            completed_count=F('completed_count') + completed,
+            **fields
+        )
+        if not updated:
+            cls.rebuild([user_id], **fields)
+
+    @classmethod
+    def count(cls, user_ids):
+        """Count the tasks of the given users from scratch (unsaved states)"""
+        states = {user_id: cls(user_id=user_id) for user_id in user_ids}
+        rows = Task.objects.filter(user_id__in=states).order_by().values('user_id').annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(completed=True))
+        )
+        for row in rows:
+            states[row['user_id']].task_count = row['total']
+            states[row['user_id']].completed_count = row['completed']
+        return list(states.values())
+
+    @classmethod
+    def rebuild(cls, user_ids, **fields):
+        """Recount the given users' tasks and store the result with one upsert"""
+        states = cls.count(user_ids)
+        for state in states:
+            for name, value in fields.items():
+                setattr(state, name, value)
+        return cls.objects.bulk_create(
+            states,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['task_count', 'completed_count', *fields]
+        )
+
+
+class TaskTombstone(models.Model):
+    """
+    Record of a deleted task, kept so that delta sync clients can drop their
+    copy. Old tombstones are removed by the compact_task_tombstones command.
+    """
+    task_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_tombstones')
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Delta sync reads a user's tombstones in (deleted_at, id) order
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+            # Compaction deletes by age across all users
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'Tombstone of task {self.task_id}'
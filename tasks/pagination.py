@@ -0,0 +1,221 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TaskKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for task lists.
+
+    Pages are addressed by the ordering values of the last row seen plus the
+    primary key as a tie-breaker, so every page is a plain indexed range query:
+    no OFFSET scan and no COUNT, whatever the depth.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+    tiebreak_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async counterpart of paginate_queryset for async views"""
+        return self._set_page([item async for item in self._page_queryset(queryset, request)])
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor['r'])
+
+        queryset = queryset.order_by(*self._order_by(self.reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(self.cursor['k'], self.reverse))
+
+        # Fetch one extra row to find out whether there is a following page.
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        has_following = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                    'example': 'http://api.example.org/api/tasks/?cursor=eyJvIjpbIi1jcmVhdGVkX2F0Il19',
+                },
+                'previous': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                    'example': 'http://api.example.org/api/tasks/?cursor=eyJvIjpbIi1jcmVhdGVkX2F0Il19',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor returned in the next/previous links',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        Return the ordering terms applied by the ordering filter, followed by
+        the tie-breaker so that every key is unique.
+        """
+        ordering = [
+            term for term in (queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(term, str)
+        ]
+        if not ordering:
+            ordering = ['-' + self.tiebreak_field]
+        names = [term.lstrip('-') for term in ordering]
+        if self.tiebreak_field not in names and 'pk' not in names:
+            prefix = '-' if ordering[0].startswith('-') else ''
+            ordering.append(prefix + self.tiebreak_field)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, item, reverse):
+        position = {
+            'o': self.ordering,
+            'k': [self._to_json(getattr(item, term.lstrip('-'))) for term in self.ordering],
+            'r': int(reverse),
+        }
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        encoded = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            position = json.loads(raw)
+            if position['o'] != self.ordering or len(position['k']) != len(self.ordering):
+                raise ValueError
+            position['k'] = [
+                self._from_json(term.lstrip('-'), value)
+                for term, value in zip(self.ordering, position['k'])
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError, binascii.Error):
+            raise ParseError(self.invalid_cursor_message)
+        return position
+
+    def _order_by(self, reverse):
+        if not reverse:
+            return self.ordering
+        return [term[1:] if term.startswith('-') else '-' + term for term in self.ordering]
+
+    def _after(self, values, reverse):
+        """
+        Build the row-value comparison "(a, b, id) > (x, y, z)" as an OR of
+        prefixes, honouring the direction of each ordering term.
+        """
+        condition = Q()
+        equal = Q()
+        for term, value in zip(self.ordering, values):
+            name = term.lstrip('-')
+            descending = term.startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _to_json(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _from_json(self, name, value):
+        if name == 'pk':
+            name = self.tiebreak_field
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as the search rank are stored as plain JSON.
+            if not isinstance(value, (int, float)):
+                raise ValueError
+            return value
+        if field.get_internal_type() == 'DateTimeField':
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValueError
+            return parsed
+        return field.to_python(value)
@@ -0,0 +1,190 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import invalidate_user_cache
+from .events import RESYNC, publish
+from .models import Task, TaskTombstone, UserTaskState
+from .serializers import TaskSerializer
+from .signals import tasks_created, tasks_deleted, tasks_status_changed, tasks_updated
+
+User = get_user_model()
+
+EVENT_FIELDS = ('id', 'title', 'description', 'completed', 'created_at', 'updated_at')
+# Bulk writes touching more tasks than this send one resync event per user
+# instead of an event per task.
+MAX_BULK_EVENTS = 100
+
+
+def deleted_with_user(origin):
+    """Whether a deletion cascades from deleting the owning user(s)"""
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+@receiver(post_save, sender=User)
+def create_task_state(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserTaskState.objects.get_or_create(user=instance)
+
+
+# Cache invalidation comes first: count_saved_task replaces the loaded
+# values that tell which user a reassigned task belonged to.
+
+@receiver(post_save, sender=Task)
+def invalidate_saved_task(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        previous_owner = getattr(instance, '_loaded_values', {}).get('user_id', instance.user_id)
+        invalidate_user_cache({instance.user_id, previous_owner}, using)
+
+
+@receiver(post_delete, sender=Task)
+def invalidate_deleted_task(sender, instance, origin=None, using=None, **kwargs):
+    if not deleted_with_user(origin):
+        invalidate_user_cache({instance.user_id}, using)
+
+
+@receiver(tasks_created, sender=Task)
+@receiver(tasks_status_changed, sender=Task)
+@receiver(tasks_deleted, sender=Task)
+def invalidate_changed_tasks(sender, tasks, using=None, **kwargs):
+    invalidate_user_cache({task.user_id for task in tasks}, using)
+
+
+@receiver(tasks_updated, sender=Task)
+def invalidate_updated_tasks(sender, user_ids, values, using=None, **kwargs):
+    user_ids = set(user_ids)
+    if 'user' in values or 'user_id' in values:
+        owner = values.get('user_id', values.get('user'))
+        user_ids.add(getattr(owner, 'pk', owner))
+    invalidate_user_cache(user_ids, using)
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if created:
+        UserTaskState.adjust(instance.user_id, tasks=1, completed=int(instance.completed))
+    elif update_fields is not None and not update_fields & {'completed', 'user', 'user_id'}:
+        return
+    elif 'completed' not in loaded or loaded.get('user_id') != instance.user_id:
+        # Unknown previous state or a change of owner: recount both users
+        UserTaskState.rebuild({instance.user_id, loaded.get('user_id', instance.user_id)})
+    elif loaded['completed'] != instance.completed:
+        UserTaskState.adjust(instance.user_id, completed=1 if instance.completed else -1)
+    instance._loaded_values = {**loaded, 'user_id': instance.user_id, 'completed': instance.completed}
+
+
+@receiver(post_delete, sender=Task)
+def record_deleted_task(sender, instance, origin=None, **kwargs):
+    # The user's state row is removed by the same cascade
+    if deleted_with_user(origin):
+        return
+    deleted_at = timezone.now()
+    UserTaskState.adjust(
+        instance.user_id,
+        tasks=-1,
+        completed=-int(instance.completed),
+        last_deleted_at=deleted_at
+    )
+    TaskTombstone.objects.create(task_id=instance.pk, user_id=instance.user_id, deleted_at=deleted_at)
+
+
+@receiver(tasks_deleted, sender=Task)
+def record_deleted_tasks(sender, tasks, **kwargs):
+    deleted_at = timezone.now()
+    totals = Counter(task.user_id for task in tasks)
+    completed = Counter(task.user_id for task in tasks if task.completed)
+    for user_id, count in totals.items():
+        UserTaskState.adjust(user_id, tasks=-count, completed=-completed[user_id], last_deleted_at=deleted_at)
+    TaskTombstone.objects.bulk_create([
+        TaskTombstone(task_id=task.pk, user_id=task.user_id, deleted_at=deleted_at) for task in tasks
+    ], batch_size=1000)
+
+
+@receiver(tasks_created, sender=Task)
+def count_created_tasks(sender, tasks, **kwargs):
+    totals = Counter(task.user_id for task in tasks)
+    completed = Counter(task.user_id for task in tasks if task.completed)
+    for user_id, count in totals.items():
+        UserTaskState.adjust(user_id, tasks=count, completed=completed[user_id])
+
+
+@receiver(tasks_status_changed, sender=Task)
+def count_status_changes(sender, tasks, **kwargs):
+    deltas = Counter()
+    for task in tasks:
+        deltas[task.user_id] += 1 if task.completed else -1
+    for user_id, delta in deltas.items():
+        if delta:
+            UserTaskState.adjust(user_id, completed=delta)
+
+
+@receiver(tasks_updated, sender=Task)
+def recount_updated_tasks(sender, user_ids, values, **kwargs):
+    if not values.keys() & {'completed', 'user', 'user_id'}:
+        return
+    user_ids = set(user_ids)
+    if 'user' in values or 'user_id' in values:
+        owner = values.get('user_id', values.get('user'))
+        user_ids.add(getattr(owner, 'pk', owner))
+    UserTaskState.rebuild(user_ids)
+
+
+def task_event_data(task):
+    return dict(TaskSerializer(task, fields=EVENT_FIELDS).data)
+
+
+def deleted_event_data(task):
+    return {'id': task.pk}
+
+
+def publish_tasks(event, tasks, using, data=task_event_data):
+    by_user = {}
+    for task in tasks:
+        by_user.setdefault(task.user_id, []).append(task)
+    for user_id, user_tasks in by_user.items():
+        if len(user_tasks) > MAX_BULK_EVENTS or any(task.pk is None for task in user_tasks):
+            publish(user_id, RESYNC['event'], RESYNC['data'], using)
+        else:
+            for task in user_tasks:
+                publish(user_id, event, lambda task=task: data(task), using)
+
+
+@receiver(post_save, sender=Task)
+def publish_saved_task(sender, instance, created, raw=False, using=None, **kwargs):
+    if not raw:
+        event = 'task.created' if created else 'task.updated'
+        publish(instance.user_id, event, lambda: task_event_data(instance), using)
+
+
+@receiver(post_delete, sender=Task)
+def publish_deleted_task(sender, instance, origin=None, using=None, **kwargs):
+    if not deleted_with_user(origin):
+        publish(instance.user_id, 'task.deleted', deleted_event_data(instance), using)
+
+
+@receiver(tasks_created, sender=Task)
+def publish_created_tasks(sender, tasks, using=None, **kwargs):
+    # Tasks loaded with COPY have no primary key to report
+    publish_tasks('task.created', tasks, using)
+
+
+@receiver(tasks_deleted, sender=Task)
+def publish_deleted_tasks(sender, tasks, using=None, **kwargs):
+    publish_tasks('task.deleted', tasks, using, data=deleted_event_data)
+
+
+@receiver(tasks_status_changed, sender=Task)
+def publish_status_changes(sender, tasks, using=None, **kwargs):
+    publish_tasks('task.updated', tasks, using)
+
+
+@receiver(tasks_updated, sender=Task)
+def publish_updated_tasks(sender, user_ids, using=None, **kwargs):
+    for user_id in user_ids:
+        publish(user_id, RESYNC['event'], RESYNC['data'], using)
@@ -1,8 +1,97 @@
-from rest_framework import serializers
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Task
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Accept a ``fields`` argument that limits the output to the named fields.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ValuesListSerializer:
+    """
+    Serialize ``values_list()`` rows the way a read-only ModelSerializer
+    serializes instances, without building a model instance per row.
+
+    Each output field is converted like the serializer's own field would,
+    so the output is the same. Only fields read straight from a model column
+    can be served this way; check with ``supports()`` first.
+    """
+    def __init__(self, serializer):
+        fields = list(serializer._readable_fields)
+        self.columns = list(dict.fromkeys(field.source for field in fields))
+        self.names = [field.field_name for field in fields]
+        self.fields = [(self.columns.index(field.source), field) for field in fields]
+
+    @staticmethod
+    def supports(serializer):
+        model = serializer.Meta.model
+        for field in serializer._readable_fields:
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return False
+            if model_field.is_relation:
+                return False
+        return True
+
+    def values_list(self, queryset):
+        """
+        Return the queryset's rows as named tuples of the output columns plus
+        the ordering columns, which keyset pagination reads from the last row.
+        """
+        ordering = [
+            term.lstrip('-') for term in (queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(term, str)
+        ]
+        columns = list(dict.fromkeys([*self.columns, *ordering, 'id']))
+        return queryset.values_list(*columns, named=True)
+
+    def to_representation(self, rows):
+        names = self.names
+        fields = [(index, self.converter(field)) for index, field in self.fields]
+        return [
+            dict(zip(names, [None if row[index] is None else convert(row[index]) for index, convert in fields]))
+            for row in rows
+        ]
+
+    @staticmethod
+    def converter(field):
+        """
+        Return a function that converts a column value like ``field`` does.
+        Plain fields map to the builtin they call. DateTimeField looks up the
+        current time zone for every value, so it is resolved once here.
+        """
+        field_type = type(field)
+        if field_type is serializers.IntegerField:
+            return int
+        if field_type is serializers.CharField:
+            return str
+        if field_type is serializers.BooleanField and not field.allow_null:
+            return bool
+        if field_type is serializers.DateTimeField:
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            if output_format and output_format.lower() == ISO_8601 and field_timezone is not None:
+                def convert(value):
+                    if type(value) is not datetime or value.tzinfo is None:
+                        return field.to_representation(value)
+                    value = value.astimezone(field_timezone).isoformat()
+                    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+                return convert
+        return field.to_representation
+
+
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)  # Shows user email
     
     class Meta:
@@ -30,7 +119,7 @@ class TaskCreateUpdateSerializer(serializers.ModelSerializer):
         return value.strip() if value else ""
 
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Lighter serializer for list views"""
     class Meta:
         model = Task
@@ -45,7 +134,114 @@ class TaskStatsSerializer(serializers.Serializer):
     completion_rate = serializers.FloatField()
 
 
+class TaskBulkItemResultSerializer(serializers.Serializer):
+    """Outcome of a single item of a bulk request"""
+    index = serializers.IntegerField()
+    status = serializers.IntegerField()
+    task = TaskSerializer(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class TaskBulkCreateResultSerializer(serializers.Serializer):
+    """Serializer for bulk task creation results"""
+    created = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = TaskBulkItemResultSerializer(many=True)
+
+
+class TaskBulkStatusFilterSerializer(serializers.Serializer):
+    """Selects the user's tasks by status and creation time"""
+    completed = serializers.BooleanField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+
+
+class TaskBulkStatusSerializer(serializers.Serializer):
+    """Serializer for bulk status changes"""
+    ACTION_CHOICES = ('complete', 'pending', 'toggle')
+
+    action = serializers.ChoiceField(choices=ACTION_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=1000
+    )
+    filter = TaskBulkStatusFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either 'ids' or 'filter'")
+        return attrs
+
+
+class TaskStatusSerializer(serializers.Serializer):
+    """Completion state of a single task"""
+    id = serializers.IntegerField()
+    completed = serializers.BooleanField()
+
+
+class TaskBulkStatusResultSerializer(serializers.Serializer):
+    """Serializer for bulk status change results"""
+    updated = serializers.IntegerField()
+    tasks = TaskStatusSerializer(many=True)
+
+
+class TaskBatchOperationSerializer(serializers.Serializer):
+    """A single operation of a batch request"""
+    OPERATIONS = ('create', 'update', 'delete', 'complete', 'pending', 'toggle')
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(min_value=1, required=False)
+    data = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError(f"'{attrs['op']}' needs the 'id' of a task")
+        if attrs['op'] in ('create', 'update') and 'data' not in attrs:
+            raise serializers.ValidationError(f"'{attrs['op']}' needs the task 'data'")
+        return attrs
+
+
+class TaskBatchSerializer(serializers.Serializer):
+    """Serializer for batch requests"""
+    operations = TaskBatchOperationSerializer(many=True, allow_empty=False, max_length=100)
+    stop_on_error = serializers.BooleanField(default=False)
+
+
+class TaskBatchResultSerializer(serializers.Serializer):
+    """Serializer for batch request results"""
+    succeeded = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    skipped = serializers.IntegerField()
+    results = TaskBulkItemResultSerializer(many=True)
+
+
+class TaskTombstoneSerializer(serializers.Serializer):
+    """A deleted task"""
+    id = serializers.IntegerField(source='task_id')
+    deleted_at = serializers.DateTimeField()
+
+
+class TaskChangesSerializer(serializers.Serializer):
+    """Serializer for delta sync responses"""
+    changed = TaskSerializer(many=True)
+    deleted = TaskTombstoneSerializer(many=True)
+    has_more = serializers.BooleanField()
+    token = serializers.CharField()
 
 
+class TaskCacheKindStatsSerializer(serializers.Serializer):
+    """Cache counters of one kind of read"""
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+    hit_rate = serializers.FloatField()
 
 
+class TaskCacheStatsSerializer(serializers.Serializer):
+    """Serializer for task cache statistics"""
+    enabled = serializers.BooleanField()
+    ttl = serializers.IntegerField()
+    list = TaskCacheKindStatsSerializer()
+    detail = TaskCacheKindStatsSerializer()
+    stats = TaskCacheKindStatsSerializer()
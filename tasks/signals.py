@@ -0,0 +1,19 @@
+from django.dispatch import Signal
+
+# Queryset-level task writes bypass the model save/delete signals. TaskQuerySet
+# sends these instead so that derived per-user data can stay in sync; they are
+# sent inside the transaction that performed the write.
+
+# Sent after bulk_create() with the created ``tasks``
+tasks_created = Signal()
+
+# Sent after set_completed() with the ``tasks`` whose status changed
+tasks_status_changed = Signal()
+
+# Sent after a queryset update() with the ``user_ids`` owning the matched tasks
+# and the updated ``values``
+tasks_updated = Signal()
+
+# Sent after a queryset delete() with the deleted ``tasks``, loaded with their
+# id, owner and status only
+tasks_deleted = Signal()
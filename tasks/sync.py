@@ -0,0 +1,134 @@
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Task, TaskTombstone
+
+# Rows written by transactions that commit out of timestamp order can land
+# behind a position already handed out. The token of a final page never moves
+# past this much before the request time, so such rows are picked up (and
+# recent changes sent again) by the next sync.
+SETTLE_WINDOW = timedelta(seconds=5)
+CHANGES_LIMIT = 500
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'TASK_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def encode_token(tasks_position, tombstones_position):
+    position = {
+        't': [tasks_position[0].isoformat(), tasks_position[1]],
+        'd': [tombstones_position[0].isoformat(), tombstones_position[1]],
+    }
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """
+    Return the (timestamp, id) positions of the task and tombstone streams.
+    Raises InvalidToken for garbage and ExpiredToken when tombstones the
+    client has not seen may already have been compacted away.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        position = json.loads(raw)
+        tasks_position, tombstones_position = [
+            (parse_datetime(position[key][0]), int(position[key][1])) for key in ('t', 'd')
+        ]
+    except (TypeError, ValueError, KeyError, IndexError, binascii.Error):
+        raise InvalidToken
+    if tasks_position[0] is None or tombstones_position[0] is None:
+        raise InvalidToken
+    if tombstones_position[0] < timezone.now() - tombstone_retention():
+        raise ExpiredToken
+    return tasks_position, tombstones_position
+
+
+def _after(field, position):
+    stamp, pk = position
+    return Q(**{f'{field}__gt': stamp}) | Q(**{field: stamp, 'id__gt': pk})
+
+
+def _read(queryset, field, position, limit):
+    """
+    Read up to ``limit`` rows after ``position`` in (field, id) order and
+    return them with whether more rows remain.
+    """
+    if position is not None:
+        queryset = queryset.filter(_after(field, position))
+    rows = list(queryset.order_by(field, 'id')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, more
+
+
+def _resume_at(rows, field, more, settled):
+    """
+    Position for the next call. A full page resumes after its last row so
+    that paging always makes progress; the last page resumes from
+    ``settled``, re-sending whatever changed within the settle window.
+    """
+    if more:
+        last = rows[-1]
+        return getattr(last, field), last.pk
+    return settled, 0
+
+
+def changes_since(user, token=None, limit=CHANGES_LIMIT):
+    """
+    Return the user's tasks created or updated after ``token``, tombstones of
+    the tasks deleted after it, whether more changes remain and the token for
+    the next call. Without a token every task is a change.
+
+    Both streams are read through the (user, timestamp, id) indexes, so the
+    cost depends on the number of changes rather than the number of tasks.
+    """
+    settled = timezone.now() - SETTLE_WINDOW
+    if token:
+        tasks_position, tombstones_position = decode_token(token)
+    else:
+        tasks_position, tombstones_position = None, (settled, 0)
+
+    tasks, more_tasks = _read(Task.objects.filter(user=user), 'updated_at', tasks_position, limit)
+    tombstones, more_tombstones = _read(
+        TaskTombstone.objects.filter(user=user), 'deleted_at', tombstones_position, limit
+    )
+    next_token = encode_token(
+        _resume_at(tasks, 'updated_at', more_tasks, settled),
+        _resume_at(tombstones, 'deleted_at', more_tombstones, settled),
+    )
+    return tasks, tombstones, more_tasks or more_tombstones, next_token
+
+
+def compact_tombstones(older_than=None, batch_size=1000):
+    """
+    Delete tombstones older than the retention period in batches and return
+    how many were removed. Tokens positioned before the cutoff expire.
+    """
+    cutoff = timezone.now() - (tombstone_retention() if older_than is None else older_than)
+    removed = 0
+    while True:
+        ids = list(
+            TaskTombstone.objects.filter(deleted_at__lt=cutoff)
+            .order_by('deleted_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return removed
+        removed += TaskTombstone.objects.filter(id__in=ids).delete()[0]
@@ -1,3 +1,1202 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import re
+import tempfile
+import threading
+import time
+import types
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from application.parsers import ORJSONParser
+from application.renderers import ORJSONRenderer
+
+from . import views
+from .caching import hit_counter
+from .events import PostgresBroker
+from .filters import TaskSearchFilter
+from .models import Task, TaskTombstone, UserTaskState
+from .sync import changes_since, compact_tombstones
+from .serializers import TaskCreateUpdateSerializer, TaskListSerializer, TaskSerializer, ValuesListSerializer
+from .urls import async_urlpatterns
+
+User = get_user_model()
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+async_urls = types.ModuleType('async_urls')
+async_urls.urlpatterns = [path('api/tasks/', include((async_urlpatterns, 'tasks')))]
+
+
+class QueryPlanAssertionsMixin:
+    """
+    Run EXPLAIN on queries against the task table and fail when the planner
+    falls back to a sequential scan. Works on SQLite and PostgreSQL.
+    """
+    table = Task._meta.db_table
+
+    @classmethod
+    def seed_tasks(cls, users=20, tasks_per_user=50):
+        now = timezone.now()
+        owners = [
+            User.objects.create_user(email=f'plan{i}@example.com', password=None)
+            for i in range(users)
+        ]
+        Task.objects.bulk_create([
+            Task(
+                user=owner,
+                title=f'Task {n}',
+                description='Seeded for query plan tests',
+                completed=n % 3 == 0,
+            )
+            for owner in owners
+            for n in range(tasks_per_user)
+        ])
+        # Spread timestamps so that range predicates are selective.
+        for offset, pk in enumerate(Task.objects.values_list('pk', flat=True)):
+            stamp = now - timedelta(hours=offset)
+            Task.objects.filter(pk=pk).update(created_at=stamp, updated_at=stamp)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return owners
+
+    def explain(self, sql, params=None):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The seeded table is small enough that PostgreSQL would pick a
+                # sequential scan on cost alone; make it prove an index exists.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+                return '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertNoSeqScan(self, sql, params=None):
+        plan = self.explain(sql, params)
+        if connection.vendor == 'postgresql':
+            scanned = f'Seq Scan on {self.table}' in plan
+        else:
+            # SQLite reports SEARCH when an index constraint is used and SCAN
+            # when it walks the whole table or index. A full index walk is only
+            # acceptable when it supplies the order for a LIMIT-ed query.
+            scan = re.search(rf'\bSCAN {self.table}\b( USING (?:COVERING )?INDEX)?', plan)
+            scanned = scan is not None and not (scan.group(1) and ' LIMIT ' in sql.upper())
+        if scanned:
+            self.fail(f'Sequential scan on {self.table}:\n{sql}\n{plan}')
+
+    def assertQuerysetUsesIndex(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        self.assertNoSeqScan(sql, params)
+
+    def assertQueriesUseIndex(self, captured):
+        """Check every captured statement that touches the task table."""
+        statements = [
+            query['sql'] for query in captured
+            if self.table in query['sql']
+            and query['sql'].lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE'))
+        ]
+        self.assertTrue(statements, 'No task queries were captured')
+        for sql in statements:
+            self.assertNoSeqScan(sql)
+
+
+class TaskQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.seed_tasks()[0]
+        cls.task = Task.objects.filter(user=cls.user).first()
+
+    def setUp(self):
+        # Throttle history and task reads are cached per user id, and ids are
+        # reused between tests
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400, response.content)
+        self.assertQueriesUseIndex(captured)
+        return response
+
+    def test_task_list_queries(self):
+        for query in [
+            '',
+            'completed=true',
+            'completed=false',
+            'ordering=created_at',
+            'ordering=-updated_at',
+            'ordering=title',
+            'search=Task 1',
+            'completed=false&ordering=-created_at&search=Task',
+        ]:
+            with self.subTest(query=query):
+                response = self.request('get', f'/api/tasks/?page_size=10&{query}')
+                self.assertIsNotNone(response.data['next'])
+                # The keyset predicate of the following page must stay indexed too.
+                self.request('get', response.data['next'])
+
+    def test_task_detail_queries(self):
+        self.request('get', f'/api/tasks/{self.task.pk}/')
+
+    def test_task_status_queries(self):
+        for action in ['complete', 'pending', 'toggle']:
+            with self.subTest(action=action):
+                self.request('post', f'/api/tasks/{self.task.pk}/{action}/')
+
+    def test_task_changes_queries(self):
+        token = self.request('get', '/api/tasks/changes/').data['token']
+        self.request('get', f'/api/tasks/changes/?since={token}')
+
+    def test_task_stats_reads_counters(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/tasks/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_tasks'], 50)
+        self.assertFalse([query for query in captured if self.table in query['sql']])
+
+
+class TaskStatusTransitionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='status@example.com', password=None)
+        cls.other = User.objects.create_user(email='other@example.com', password=None)
+        cls.task = Task.objects.create(user=cls.user, title='Write report', description='Quarterly')
+        cls.foreign_task = Task.objects.create(user=cls.other, title='Not yours')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, action, task=None):
+        return self.client.post(f'/api/tasks/{(task or self.task).pk}/{action}/')
+
+    def assertTransitions(self):
+        response = self.post('complete')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['completed'])
+        self.assertEqual(response.data['title'], 'Write report')
+        self.assertEqual(response.data['user'], self.user.email)
+
+        # Completing again is a no-op that still returns the task
+        completed_at = Task.objects.get(pk=self.task.pk).updated_at
+        response = self.post('complete')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['completed'])
+        self.assertEqual(Task.objects.get(pk=self.task.pk).updated_at, completed_at)
+
+        response = self.post('toggle')
+        self.assertFalse(response.data['completed'])
+        response = self.post('toggle')
+        self.assertTrue(response.data['completed'])
+        response = self.post('pending')
+        self.assertFalse(response.data['completed'])
+        self.assertFalse(Task.objects.get(pk=self.task.pk).completed)
+
+        self.assertGreater(Task.objects.get(pk=self.task.pk).updated_at, completed_at)
+        for action in ['complete', 'pending', 'toggle']:
+            self.assertEqual(self.post(action, self.foreign_task).status_code, 404)
+        self.assertFalse(Task.objects.get(pk=self.foreign_task.pk).completed)
+
+    def test_transitions(self):
+        self.assertTransitions()
+
+    def test_transitions_without_update_returning(self):
+        with mock.patch('tasks.managers.supports_update_returning', return_value=False):
+            self.assertTransitions()
+
+    def test_status_change_is_a_single_task_statement(self):
+        if not connection.features.can_return_columns_from_insert:
+            self.skipTest('Backend cannot return rows from UPDATE')
+        for action in ['toggle', 'pending', 'complete']:
+            with self.subTest(action=action), CaptureQueriesContext(connection) as captured:
+                self.post(action)
+            task_statements = [query['sql'] for query in captured if Task._meta.db_table in query['sql']]
+            self.assertEqual(len(task_statements), 1, task_statements)
+            self.assertTrue(task_statements[0].startswith('UPDATE'))
+
+    def test_toggle_flips_in_the_database(self):
+        # A stale in-memory copy must not decide the new value
+        Task.objects.filter(pk=self.task.pk).update(completed=True)
+        for returning in [True, False]:
+            with mock.patch('tasks.managers.supports_update_returning', return_value=returning):
+                changed = Task.objects.filter(pk=self.task.pk).set_completed(None)
+            self.assertEqual([task.completed for task in changed], [False])
+            Task.objects.filter(pk=self.task.pk).update(completed=True)
+
+
+class TaskBulkStatusTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='bulk-status@example.com', password=None)
+        cls.foreign_task = Task.objects.create(
+            user=User.objects.create_user(email='bulk-status-other@example.com', password=None), title='Not yours'
+        )
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk_status(self, data):
+        return self.client.post('/api/tasks/bulk/status/', data, format='json')
+
+    def test_by_ids(self):
+        tasks = Task.objects.bulk_create([
+            Task(user=self.user, title=f'Task {n}', completed=n % 2 == 0) for n in range(4)
+        ])
+        ids = [task.pk for task in tasks] + [self.foreign_task.pk]
+        response = self.bulk_status({'action': 'toggle', 'ids': ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(
+            sorted((item['id'], item['completed']) for item in response.data['tasks']),
+            [(task.pk, not task.completed) for task in tasks]
+        )
+        self.assertFalse(Task.objects.get(pk=self.foreign_task.pk).completed)
+
+    def test_by_filter(self):
+        Task.objects.bulk_create([Task(user=self.user, title=f'Task {n}') for n in range(3)])
+        old = Task.objects.create(user=self.user, title='Old')
+        Task.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        response = self.bulk_status({
+            'action': 'complete',
+            'filter': {'completed': False, 'created_before': (timezone.now() - timedelta(days=1)).isoformat()},
+        })
+        self.assertEqual([item['id'] for item in response.data['tasks']], [old.pk])
+        response = self.bulk_status({'action': 'complete', 'filter': {'completed': False}})
+        self.assertEqual(response.data['updated'], 3)
+        self.assertFalse(Task.objects.filter(user=self.user, completed=False).exists())
+        # Completing completed tasks changes nothing
+        self.assertEqual(self.bulk_status({'action': 'complete', 'filter': {}}).data['updated'], 0)
+
+    def test_invalid(self):
+        for data in (
+            {'action': 'archive', 'ids': [1]},
+            {'action': 'complete'},
+            {'action': 'complete', 'ids': [1], 'filter': {}},
+            {'action': 'complete', 'ids': []},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.bulk_status(data).status_code, 400)
+
+
+class TaskPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='pages@example.com', password=None)
+        Task.objects.bulk_create([Task(user=cls.user, title=f'Task {n % 3}') for n in range(7)])
+        Task.objects.create(user=User.objects.create_user(email='pages-other@example.com', password=None), title='Hidden')
+        # Ties on every ordering, broken by the id
+        now = timezone.now()
+        for n, task in enumerate(Task.objects.filter(user=cls.user)):
+            Task.objects.filter(pk=task.pk).update(
+                created_at=now - timedelta(minutes=n // 2), updated_at=now - timedelta(minutes=n // 3)
+            )
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [task['id'] for task in response.data['results']]
+
+    def test_round_trip(self):
+        for ordering in ('created_at', '-created_at', 'updated_at', '-updated_at', 'title', '-title', None):
+            with self.subTest(ordering=ordering):
+                term = ordering or '-created_at'
+                expected = list(Task.objects.filter(user=self.user).order_by(
+                    term, '-id' if term.startswith('-') else 'id'
+                ).values_list('id', flat=True))
+                params = {'page_size': 3, **({'ordering': ordering} if ordering else {})}
+                response = self.client.get('/api/tasks/', params)
+                seen = self.ids(response)
+                while response.data['next']:
+                    response = self.client.get(response.data['next'])
+                    seen += self.ids(response)
+                self.assertEqual(seen, expected)
+
+                # And back again through the previous links
+                seen = self.ids(response)
+                while response.data['previous']:
+                    response = self.client.get(response.data['previous'])
+                    seen = self.ids(response) + seen
+                self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        next_link = self.client.get('/api/tasks/', {'page_size': 3, 'ordering': 'title'}).data['next']
+        cursor = next_link.split('cursor=')[1].split('&')[0]
+        for params in (
+            {'cursor': 'not-a-cursor'},
+            {'cursor': cursor[:-4]},
+            # A cursor of another ordering
+            {'cursor': cursor, 'ordering': 'created_at'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/tasks/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+
+class TaskCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='counters@example.com', password=None)
+        cls.other = User.objects.create_user(email='counters-other@example.com', password=None)
+
+    def assertCountersCorrect(self):
+        for state in UserTaskState.count([self.user.pk, self.other.pk]):
+            stored = UserTaskState.objects.get(user_id=state.user_id)
+            self.assertEqual(
+                (stored.task_count, stored.completed_count), (state.task_count, state.completed_count)
+            )
+
+    def test_writes_keep_counters(self):
+        task = Task.objects.create(user=self.user, title='Single')
+        writes = [
+            lambda: Task.objects.bulk_create([Task(user=self.user, title=f'Bulk {n}', completed=n % 2 == 0) for n in range(4)]),
+            lambda: Task.objects.filter(pk=task.pk).set_completed(True),
+            lambda: Task.objects.filter(title__startswith='Bulk').update(completed=True),
+            lambda: Task.objects.filter(title='Bulk 0').update(user=self.other),
+            lambda: Task.objects.get(title='Bulk 1').delete(),
+            lambda: Task.objects.filter(user=self.user, completed=True).delete(),
+        ]
+        for write in writes:
+            write()
+            self.assertCountersCorrect()
+        self.assertEqual(UserTaskState.objects.get(user=self.user).task_count, 0)
+        self.assertEqual(TaskTombstone.objects.filter(user=self.user).count(), 4)
+
+    def test_delete_work_is_per_user(self):
+        def delete(count):
+            Task.objects.bulk_create(
+                [Task(user=user, title='Doomed') for user in (self.user, self.other) for _ in range(count)]
+            )
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(Task.objects.filter(title='Doomed').delete()[0], count * 2)
+            return len(captured)
+
+        self.assertEqual(delete(2), delete(20))
+        self.assertCountersCorrect()
+        self.assertEqual(TaskTombstone.objects.count(), 44)
+
+    def test_rebuild_command(self):
+        Task.objects.bulk_create([Task(user=self.user, title='Counted', completed=True) for _ in range(3)])
+        UserTaskState.objects.filter(user=self.user).update(task_count=7)
+        UserTaskState.objects.filter(user=self.other).delete()
+
+        out = io.StringIO()
+        call_command('rebuild_task_counters', verify=True, stdout=out)
+        self.assertIn('2 of 2 users have wrong task counters', out.getvalue())
+        self.assertEqual(UserTaskState.objects.get(user=self.user).task_count, 7)
+
+        call_command('rebuild_task_counters', batch_size=1, stdout=io.StringIO())
+        self.assertCountersCorrect()
+        out = io.StringIO()
+        call_command('rebuild_task_counters', verify=True, stdout=out)
+        self.assertIn('Task counters of 2 users are correct', out.getvalue())
+
+
+class TaskSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='search@example.com', password=None)
+        other = User.objects.create_user(email='search-other@example.com', password=None)
+        cls.report = Task.objects.create(user=cls.user, title='Write report', description='Quarterly numbers')
+        cls.notes = Task.objects.create(user=cls.user, title='Meeting notes', description='Mention the report')
+        Task.objects.create(user=cls.user, title='Groceries', description='Milk')
+        Task.objects.create(user=other, title='Report for someone else')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        response = self.client.get('/api/tasks/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [task['id'] for task in response.data['results']]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search('report'), [self.report.pk, self.notes.pk])
+        self.assertEqual(self.search('REP'), [self.report.pk, self.notes.pk])
+        self.assertEqual(self.search('report', ordering='-created_at'), [self.notes.pk, self.report.pk])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('report quarterly'), [self.report.pk])
+        self.assertEqual(self.search('report milk'), [])
+
+    def test_search_follows_writes(self):
+        self.report.title = 'Write summary'
+        self.report.description = ''
+        self.report.save()
+        self.notes.delete()
+        self.assertEqual(self.search('report'), [])
+        self.assertEqual(self.search('summary'), [self.report.pk])
+
+    def test_search_results_page_by_relevance(self):
+        Task.objects.bulk_create([
+            Task(user=self.user, title=f'Report {n}', description='report ' * (n % 3)) for n in range(12)
+        ])
+        expected = self.search('report', page_size=50)
+        seen, url = [], '/api/tasks/?search=report&page_size=5'
+        while url:
+            response = self.client.get(url)
+            seen += [task['id'] for task in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_cursor_rank_compares_equal(self):
+        response = self.client.get('/api/tasks/', {'search': 'report', 'page_size': 1})
+        encoded = re.search(r'cursor=([\w-]+)', response.data['next']).group(1)
+        position = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+        self.assertEqual(position['o'][0], '-search_rank')
+
+        request = Request(APIRequestFactory().get('/api/tasks/', {'search': 'report'}))
+        ranked = TaskSearchFilter().filter_queryset(request, Task.objects.filter(user=self.user), None)
+        # The rank read back from the cursor must select the row it was taken
+        # from, or rows tied on relevance are skipped or repeated across pages
+        self.assertEqual(
+            list(ranked.filter(search_rank=position['k'][0]).values_list('pk', flat=True)), [self.report.pk]
+        )
+
+
+class TaskSparseFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='fields@example.com', password=None)
+        cls.task = Task.objects.create(user=cls.user, title='Write report', description='Quarterly numbers')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        # The last task query loads the rendered rows
+        return response, [query['sql'] for query in captured if Task._meta.db_table in query['sql']][-1]
+
+    def test_list_fields(self):
+        response, sql = self.get('/api/tasks/?fields=id,description,user')
+        self.assertEqual(response.data['results'], [
+            {'id': self.task.pk, 'description': 'Quarterly numbers', 'user': self.user.email}
+        ])
+        self.assertNotIn('"title"', sql)
+        self.assertNotIn('"users_', sql)
+
+    def test_list_defers_description_by_default(self):
+        response, sql = self.get('/api/tasks/')
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertNotIn('"description"', sql)
+
+    def test_detail_fields(self):
+        response, sql = self.get(f'/api/tasks/{self.task.pk}/?fields=title')
+        self.assertEqual(response.data, {'title': 'Write report'})
+        self.assertNotIn('"description"', sql)
+
+    def test_unknown_field(self):
+        response = self.client.get(f'/api/tasks/{self.task.pk}/?fields=title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+
+class TaskExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='export@example.com', password=None)
+        Task.objects.bulk_create([
+            Task(user=cls.user, title=f'Task {n}', description='Line one\nline two', completed=n % 2 == 0)
+            for n in range(5)
+        ])
+        Task.objects.create(user=User.objects.create_user(email='export-other@example.com', password=None), title='Hidden')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_matches_list(self):
+        query = 'completed=true&ordering=title'
+        response = self.client.get(f'/api/tasks/export/?{query}')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        listed = self.client.get(
+            f'/api/tasks/?{query}&fields=id,title,description,completed,created_at,updated_at'
+        ).data['results']
+        self.assertEqual(rows, [dict(task) for task in listed])
+
+    def test_gzipped_csv(self):
+        response = self.client.get('/api/tasks/export/?type=csv', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['description'], 'Line one\nline two')
+
+    def test_gzip_negotiation(self):
+        for accept_encoding, gzipped in (
+            ('gzip;q=0', False),
+            ('br, gzip;q=0.5', True),
+            ('*', True),
+            ('*;q=1, gzip;q=0', False),
+            ('identity', False),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get('/api/tasks/export/', HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertEqual(response.get('Content-Encoding') == 'gzip', gzipped)
+
+    def test_unknown_type(self):
+        self.assertEqual(self.client.get('/api/tasks/export/?type=xml').status_code, 400)
+
+    async def test_streams_under_asgi(self):
+        response = await AsyncClient().get(
+            '/api/tasks/export/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        )
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 5)
+
+
+class TaskImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='import@example.com', password=None)
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content):
+        response = self.client.post(
+            '/api/tasks/import/', {'file': SimpleUploadedFile(name, content)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_ndjson_import(self):
+        content = b'{"title": "  "}\nnot json\n' + b''.join(
+            b'{"title": "Task %d", "completed": %s}\n' % (n, b'true' if n % 2 else b'false') for n in range(5)
+        )
+        events = self.upload('tasks.ndjson', content)
+        self.assertEqual([event['line'] for event in events if event['event'] == 'error'], [1, 2])
+        self.assertEqual(events[-1], {'event': 'done', 'processed': 7, 'imported': 5, 'failed': 2})
+        state = UserTaskState.for_user(self.user)
+        self.assertEqual((state.task_count, state.completed_count), (5, 2))
+
+    def test_csv_import(self):
+        content = 'title,description,completed\nReport,"Two\nlines",true\n,,\n'.encode('utf-8')
+        events = self.upload('tasks.csv', content)
+        self.assertEqual((events[0]['event'], events[0]['line'], list(events[0]['errors'])), ('error', 4, ['title']))
+        self.assertEqual(events[-1]['imported'], 1)
+        task = Task.objects.get(user=self.user)
+        self.assertEqual((task.description, task.completed), ('Two\nlines', True))
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as upload:
+            upload.write(b'{"title": "From the command"}\n')
+            upload.flush()
+            upload.write(b''.join(b'{"title": "Task %d"}\n' % n for n in range(4)))
+            upload.flush()
+            output = io.StringIO()
+            call_command('import_tasks', upload.name, user=self.user.email, batch_size=2, stdout=output)
+        self.assertEqual(output.getvalue().count('Processed'), 3)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 5)
+
+
+class TaskChangesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='sync@example.com', password=None)
+        cls.tasks = Task.objects.bulk_create([Task(user=cls.user, title=f'Task {n}') for n in range(5)])
+        # Settle the initial tasks outside of the re-send window
+        Task.objects.filter(user=cls.user).update(updated_at=timezone.now() - timedelta(minutes=1))
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def changes(self, token=None):
+        response = self.client.get('/api/tasks/changes/', {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_and_tombstones(self):
+        data = self.changes()
+        self.assertEqual(len(data['changed']), 5)
+        self.assertFalse(data['has_more'])
+        token = data['token']
+        self.assertEqual(self.changes(token)['changed'], [])
+
+        first, second = self.tasks[:2]
+        deleted_pk = first.pk
+        first.delete()
+        second.title = 'Renamed'
+        second.save()
+        data = self.changes(token)
+        self.assertEqual([task['title'] for task in data['changed']], ['Renamed'])
+        self.assertEqual([tombstone['id'] for tombstone in data['deleted']], [deleted_pk])
+
+    def test_paging(self):
+        seen, token, more = [], None, True
+        while more:
+            changed, _, more, token = changes_since(self.user, token, limit=2)
+            seen += [task.pk for task in changed]
+        self.assertEqual(sorted(seen), sorted(task.pk for task in self.tasks))
+
+    def test_tokens_expire_with_compacted_tombstones(self):
+        token = self.changes()['token']
+        self.tasks[0].delete()
+        self.assertEqual(self.client.get('/api/tasks/changes/', {'since': 'garbage'}).status_code, 400)
+        with self.settings(TASK_TOMBSTONE_RETENTION_DAYS=0):
+            self.assertEqual(compact_tombstones(), 1)
+            self.assertEqual(self.client.get('/api/tasks/changes/', {'since': token}).status_code, 410)
+        self.assertFalse(TaskTombstone.objects.exists())
+
+
+class TaskEventStreamTests(TransactionTestCase):
+
+    def setUp(self):
+        clear_caches()
+
+    async def test_stream(self):
+        user = await sync_to_async(User.objects.create_user)(email='events@example.com', password=None)
+        response = await AsyncClient().get(
+            '/api/tasks/events/', headers={'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        async def next_event():
+            chunk = (await asyncio.wait_for(anext(stream), 5)).decode('utf-8')
+            fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if ': ' in line)
+            return fields['event'], json.loads(fields['data'])
+
+        self.assertEqual(await next_event(), ('ready', {}))
+        task = await sync_to_async(Task.objects.create)(user=user, title='Live')
+        event, data = await next_event()
+        self.assertEqual((event, data['id'], data['title']), ('task.created', task.pk, 'Live'))
+        await sync_to_async(Task.objects.filter(pk=task.pk).set_completed)(True)
+        event, data = await next_event()
+        self.assertEqual((event, data['completed']), ('task.updated', True))
+        task_pk = task.pk
+        await sync_to_async(task.delete)()
+        self.assertEqual(await next_event(), ('task.deleted', {'id': task_pk}))
+
+    async def test_postgres_broker_skips_users_nobody_listens_to(self):
+        with mock.patch.object(PostgresBroker, '_listen'):
+            subscription = PostgresBroker().subscribe(1)
+        # Another process only sees the subscriber through the task cache
+        other_process = PostgresBroker()
+        self.assertTrue(other_process.wants(1))
+        self.assertFalse(other_process.wants(2))
+        subscription.close()
+
+    def test_releases_database_connection(self):
+        user = User.objects.create_user(email='events-connection@example.com', password=None)
+        request = mock.Mock(_request=mock.Mock(spec=ASGIRequest), user=user)
+        with mock.patch.object(views, 'close_old_connections') as close_old_connections:
+            views.TaskEventStreamView().get(request)
+        close_old_connections.assert_called_once()
+
+    def test_requires_asgi(self):
+        user = User.objects.create_user(email='events-wsgi@example.com', password=None)
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get('/api/tasks/events/').status_code, 501)
+
+
+@override_settings(ROOT_URLCONF=async_urls)
+class TaskAsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='async@example.com', password=None)
+        cls.other = User.objects.create_user(email='async-other@example.com', password=None)
+        cls.foreign = Task.objects.create(user=cls.other, title='Not yours')
+
+    def setUp(self):
+        clear_caches()
+        self.client = AsyncClient()
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def test_crud(self):
+        response = await self.client.post(
+            '/api/tasks/', {'title': ' Async '}, content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 201)
+        task_id = response.json()['id']
+
+        response = await self.client.get('/api/tasks/', headers=self.headers)
+        self.assertEqual([task['title'] for task in response.json()['results']], ['Async'])
+        response = await self.client.get('/api/tasks/', headers={**self.headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.client.get(f'/api/tasks/{task_id}/?fields=title,user', headers=self.headers)
+        self.assertEqual(response.json(), {'title': 'Async', 'user': 'async@example.com'})
+        response = await self.client.patch(
+            f'/api/tasks/{task_id}/', {'completed': True}, content_type='application/json', headers=self.headers
+        )
+        self.assertTrue(response.json()['completed'])
+        response = await self.client.post(f'/api/tasks/{task_id}/toggle/', headers=self.headers)
+        self.assertFalse(response.json()['completed'])
+
+        response = await self.client.get('/api/tasks/stats/', headers=self.headers)
+        self.assertEqual(response.json()['total_tasks'], 1)
+        response = await self.client.delete(f'/api/tasks/{task_id}/', headers=self.headers)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(await Task.objects.filter(pk=task_id).aexists())
+
+    async def test_authentication_and_ownership(self):
+        response = await self.client.get('/api/tasks/stats/')
+        self.assertEqual(response.status_code, 401)
+        for method, url in (
+            ('get', f'/api/tasks/{self.foreign.pk}/'),
+            ('delete', f'/api/tasks/{self.foreign.pk}/'),
+            ('post', f'/api/tasks/{self.foreign.pk}/complete/'),
+        ):
+            response = await getattr(self.client, method)(url, headers=self.headers)
+            self.assertEqual(response.status_code, 404)
+        self.assertFalse((await Task.objects.aget(pk=self.foreign.pk)).completed)
+
+    async def test_throttling(self):
+        with mock.patch.dict('rest_framework.throttling.SimpleRateThrottle.THROTTLE_RATES', {'low_security': '1/min'}):
+            first = await self.client.get('/api/tasks/stats/', headers=self.headers)
+            second = await self.client.get('/api/tasks/stats/', headers=self.headers)
+        self.assertEqual((first.status_code, second.status_code), (200, 429))
+
+
+class TaskJSONTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='json@example.com', password=None)
+        Task.objects.create(user=cls.user, title='Ünïcode \u2028 "quoted"', completed=True)
+        Task.objects.create(user=cls.user, title='Plain')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_responses_match_stock_renderer(self):
+        for url in ('/api/tasks/', '/api/tasks/stats/', f'/api/tasks/{Task.objects.first().pk}/'):
+            response = self.client.get(url)
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_parser_matches_stock_parser(self):
+        for body in (b'{"title": "\xc3\x9c", "completed": true}', b'{"a": NaN}', b'{bad'):
+            results = []
+            for parser in (JSONParser(), ORJSONParser()):
+                try:
+                    results.append(parser.parse(io.BytesIO(body)))
+                except Exception as exc:
+                    results.append((type(exc), str(exc)))
+            self.assertEqual(results[0], results[1])
+
+
+class TaskValuesListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rows@example.com', password=None)
+        Task.objects.bulk_create(
+            Task(user=cls.user, title=f'Task {number}', description='x' * number, completed=number % 2 == 0)
+            for number in range(5)
+        )
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_matches_serializer(self):
+        tasks = Task.objects.filter(user=self.user).order_by('-created_at')
+        for serializer in (TaskListSerializer(), TaskSerializer(fields=['updated_at', 'id', 'description'])):
+            self.assertTrue(ValuesListSerializer.supports(serializer))
+            rows = ValuesListSerializer(serializer)
+            self.assertEqual(
+                rows.to_representation(rows.values_list(tasks)),
+                type(serializer)(tasks, many=True, fields=list(serializer.fields)).data
+            )
+        self.assertFalse(ValuesListSerializer.supports(TaskSerializer()))
+
+    @override_settings(TASK_CACHE_TTL=0)
+    def test_list_responses_match(self):
+        for url in ('/api/tasks/?page_size=2', '/api/tasks/?ordering=title&fields=title', '/api/tasks/?search=task'):
+            fast = self.client.get(url)
+            with mock.patch('tasks.views.ValuesListMixin.get_values_list_serializer', return_value=None):
+                slow = self.client.get(url)
+            self.assertEqual(fast.content, slow.content)
+            next_url = fast.json()['next']
+            if next_url:
+                self.assertEqual(self.client.get(next_url).status_code, 200)
+
+
+class TaskConditionalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='conditional@example.com', password=None)
+        cls.task = Task.objects.create(user=cls.user, title='Conditional')
+        cls.other = Task.objects.create(user=cls.user, title='Other')
+        Task.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_etag(self):
+        for url in ('/api/tasks/', f'/api/tasks/{self.task.pk}/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.client.delete(f'/api/tasks/{self.other.pk}/')
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_reads_counters(self):
+        with CaptureQueriesContext(connection) as captured:
+            etag = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH='"stale"')['ETag']
+        # The task count comes from UserTaskState instead of COUNT over the tasks
+        self.assertFalse(any('COUNT(' in query['sql'] for query in captured.captured_queries))
+        # A new task older than the newest update still changes the ETag
+        Task.objects.create(user=self.user, title='Backdated')
+        Task.objects.filter(title='Backdated').update(updated_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        url = f'/api/tasks/{self.task.pk}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.client.patch(url, {'title': 'Changed'})
+        # Within the second of the change Last-Modified could not tell a
+        # later write apart, so it is left out
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class TaskCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='cached@example.com', password=None)
+        cls.task = Task.objects.create(user=cls.user, title='Cached')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertCached(self, url):
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        return second
+
+    def test_reads_are_cached(self):
+        for url in ('/api/tasks/', f'/api/tasks/{self.task.pk}/?fields=title', '/api/tasks/stats/'):
+            with self.subTest(url=url):
+                self.assertCached(url)
+        response = self.client.get('/api/tasks/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate(self):
+        writes = [
+            lambda: self.client.post('/api/tasks/', {'title': 'New'}),
+            lambda: self.client.patch(f'/api/tasks/{self.task.pk}/', {'title': 'Renamed'}),
+            lambda: self.client.post(f'/api/tasks/{self.task.pk}/toggle/'),
+            lambda: Task.objects.filter(user=self.user).set_completed(False),
+            lambda: Task.objects.filter(user=self.user).update(description='Updated'),
+            lambda: Task.objects.bulk_create([Task(user=self.user, title='Bulk')]),
+            lambda: Task.objects.filter(title='New').delete(),
+        ]
+        urls = ('/api/tasks/', f'/api/tasks/{self.task.pk}/', '/api/tasks/stats/')
+        for write in writes:
+            cached = [self.assertCached(url).content for url in urls]
+            write()
+            self.assertNotEqual(cached, [self.client.get(url).content for url in urls])
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['total_tasks'], 2)
+
+    def test_users_are_separate(self):
+        other = User.objects.create_user(email='cached-other@example.com', password=None)
+        self.client.get('/api/tasks/')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/tasks/').data['results'], [])
+
+    def test_stats_counters(self):
+        hit_counter.reset()
+        self.client.get('/api/tasks/')
+        self.client.get('/api/tasks/')
+        self.assertEqual(self.client.get('/api/tasks/cache/').status_code, 403)
+
+        admin = User.objects.create_superuser(email='cache-admin@example.com', password='x')
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/api/tasks/cache/').data
+        self.assertEqual((stats['list']['hits'], stats['list']['misses'], stats['list']['hit_rate']), (1, 1, 50.0))
+        self.assertEqual(self.client.delete('/api/tasks/cache/').status_code, 204)
+        self.assertEqual(self.client.get('/api/tasks/cache/').data['list']['hits'], 0)
+
+
+class TaskIdempotencyTests(TransactionTestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(email='retry@example.com', password=None)
+        self.task = Task.objects.create(user=self.user, title='Toggled')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def concurrently(self, request, count=5):
+        """Send ``count`` copies of a request at once, each from its own thread"""
+        barrier = threading.Barrier(count)
+        responses = [None] * count
+
+        def send(index):
+            try:
+                barrier.wait()
+                responses[index] = request(self.client_for(self.user))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def slowed(self, func):
+        def slow(*args, **kwargs):
+            time.sleep(0.2)
+            return func(*args, **kwargs)
+        return slow
+
+    def test_retries_replay(self):
+        client = self.client_for(self.user)
+        first = client.post('/api/tasks/', {'title': 'Once'}, HTTP_IDEMPOTENCY_KEY='create-1')
+        retry = client.post('/api/tasks/', {'title': 'Once'}, HTTP_IDEMPOTENCY_KEY='create-1')
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(first.data, retry.data)
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Task.objects.filter(title='Once').count(), 1)
+
+        # The key belongs to the request it was first sent with, and to the user
+        response = client.post('/api/tasks/', {'title': 'Twice'}, HTTP_IDEMPOTENCY_KEY='create-1')
+        self.assertEqual(response.status_code, 422)
+        other = User.objects.create_user(email='retry-other@example.com', password=None)
+        response = self.client_for(other).post('/api/tasks/', {'title': 'Once'}, HTTP_IDEMPOTENCY_KEY='create-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Task.objects.filter(title='Once').count(), 2)
+
+        # Without a key every request runs
+        client.post(f'/api/tasks/{self.task.pk}/toggle/')
+        client.post(f'/api/tasks/{self.task.pk}/toggle/')
+        self.assertFalse(Task.objects.get(pk=self.task.pk).completed)
+        response = client.post(f'/api/tasks/{self.task.pk}/toggle/', HTTP_IDEMPOTENCY_KEY='x' * 256)
+        self.assertEqual(response.status_code, 400)
+
+    def test_concurrent_create(self):
+        with mock.patch.object(TaskCreateUpdateSerializer, 'save', self.slowed(TaskCreateUpdateSerializer.save)):
+            responses = self.concurrently(
+                lambda client: client.post('/api/tasks/', {'title': 'Flaky network'}, HTTP_IDEMPOTENCY_KEY='create-2')
+            )
+        self.assertEqual({response.status_code for response in responses}, {201})
+        self.assertEqual(len({response.data['id'] for response in responses}), 1)
+        self.assertEqual(sum(response.has_header('Idempotent-Replayed') for response in responses), 4)
+        self.assertEqual(Task.objects.filter(title='Flaky network').count(), 1)
+
+    def test_concurrent_toggle(self):
+        with mock.patch('tasks.views.set_task_completed', self.slowed(views.set_task_completed)):
+            responses = self.concurrently(
+                lambda client: client.post(f'/api/tasks/{self.task.pk}/toggle/', HTTP_IDEMPOTENCY_KEY='toggle-1')
+            )
+        self.assertEqual({response.data['completed'] for response in responses}, {True})
+        self.assertTrue(Task.objects.get(pk=self.task.pk).completed)
+
+    @override_settings(ROOT_URLCONF=async_urls)
+    async def test_concurrent_async_create(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}', 'Idempotency-Key': 'create-3'}
+        client = AsyncClient()
+        responses = await asyncio.gather(*[
+            client.post('/api/tasks/', {'title': 'Async retry'}, content_type='application/json', headers=headers)
+            for _ in range(5)
+        ])
+        self.assertEqual({response.status_code for response in responses}, {201})
+        self.assertEqual(len({response.json()['id'] for response in responses}), 1)
+        self.assertEqual(await Task.objects.filter(title='Async retry').acount(), 1)
+
+
+class TaskBulkCreateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='bulk@example.com', password=None)
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk_create(self, items):
+        return self.client.post('/api/tasks/bulk/', items, format='json')
+
+    def test_create(self):
+        response = self.bulk_create([{'title': 'First'}, {'title': ' '}, {'title': 'Second', 'completed': True}])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 400, 201])
+        self.assertEqual(
+            list(Task.objects.filter(user=self.user).order_by('title').values_list('title', 'completed')),
+            [('First', False), ('Second', True)]
+        )
+        self.assertEqual(self.bulk_create([{'title': 'Third'}]).status_code, 201)
+        self.assertEqual(self.bulk_create([{'title': ' '}]).status_code, 400)
+
+    def test_rejected_batches(self):
+        self.assertEqual(self.bulk_create([]).status_code, 400)
+        self.assertEqual(self.bulk_create({'title': 'Not a list'}).status_code, 400)
+        self.assertEqual(self.bulk_create([{'title': f'Task {n}'} for n in range(101)]).status_code, 400)
+        self.assertFalse(Task.objects.exists())
+
+    def test_throttled_per_task(self):
+        with mock.patch.dict('rest_framework.throttling.SimpleRateThrottle.THROTTLE_RATES', {'task_create': '5/min'}):
+            # Rejected batches cost one unit however many tasks they hold
+            self.assertEqual(self.bulk_create([{'title': f'Task {n}'} for n in range(101)]).status_code, 400)
+            self.assertEqual(self.bulk_create([{'title': f'Task {n}'} for n in range(4)]).status_code, 201)
+            self.assertEqual(self.bulk_create([{'title': 'Over'}]).status_code, 429)
+        self.assertEqual(Task.objects.count(), 4)
+
+
+class TaskBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='batch@example.com', password=None)
+        cls.other = User.objects.create_user(email='batch-other@example.com', password=None)
+        cls.task = Task.objects.create(user=cls.user, title='Existing')
+        cls.doomed = Task.objects.create(user=cls.user, title='Doomed')
+        cls.foreign = Task.objects.create(user=cls.other, title='Not yours')
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, operations, **options):
+        return self.client.post('/api/tasks/batch/', {'operations': operations, **options}, format='json')
+
+    def test_mixed_operations(self):
+        response = self.batch([
+            {'op': 'create', 'data': {'title': ' Fresh '}},
+            {'op': 'update', 'id': self.task.pk, 'data': {'description': 'Edited'}},
+            {'op': 'toggle', 'id': self.task.pk},
+            {'op': 'delete', 'id': self.doomed.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['succeeded'], response.data['failed'], response.data['skipped']), (4, 0, 0))
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 200, 200, 204])
+        self.assertEqual(response.data['results'][0]['task']['title'], 'Fresh')
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.description, self.task.completed), ('Edited', True))
+        self.assertFalse(Task.objects.filter(pk=self.doomed.pk).exists())
+
+    def test_failures(self):
+        operations = [
+            {'op': 'complete', 'id': self.foreign.pk},
+            {'op': 'create', 'data': {'title': ' '}},
+            {'op': 'complete', 'id': self.task.pk},
+        ]
+        response = self.batch(operations)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.data['results']], [404, 400, 200])
+        self.assertFalse(Task.objects.get(pk=self.foreign.pk).completed)
+        self.assertTrue(Task.objects.get(pk=self.task.pk).completed)
+
+        response = self.batch([{'op': 'pending', 'id': self.task.pk}, *operations], stop_on_error=True)
+        self.assertEqual([result['status'] for result in response.data['results']], [200, 404, 424, 424])
+        self.assertEqual((response.data['succeeded'], response.data['failed'], response.data['skipped']), (1, 1, 2))
+        self.assertFalse(Task.objects.get(pk=self.task.pk).completed)
+
+        # A malformed operation rejects the whole batch
+        response = self.batch([{'op': 'create', 'data': {'title': 'Ok'}}, {'op': 'delete'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.filter(title='Ok').exists())
+
+    def test_throttled_per_operation(self):
+        operations = [{'op': 'create', 'data': {'title': f'Task {n}'}} for n in range(3)]
+        with mock.patch.dict('rest_framework.throttling.SimpleRateThrottle.THROTTLE_RATES', {'task_create': '5/min'}):
+            self.assertEqual(self.batch(operations).status_code, 200)
+            self.assertEqual(self.batch(operations).status_code, 429)
+            self.assertEqual(self.batch([{'op': 'toggle', 'id': self.task.pk}]).status_code, 200)
+        self.assertEqual(Task.objects.filter(title__startswith='Task ').count(), 3)
+
+    def test_throttled_batch_charges_nothing(self):
+        operations = [
+            {'op': 'create', 'data': {'title': 'Charged'}},
+            {'op': 'toggle', 'id': self.task.pk},
+            {'op': 'toggle', 'id': self.task.pk},
+        ]
+        rates = {'task_create': '2/min', 'task_update': '1/min'}
+        with mock.patch.dict('rest_framework.throttling.SimpleRateThrottle.THROTTLE_RATES', rates):
+            self.assertEqual(self.batch(operations).status_code, 429)
+            # The rejected batch left the whole creation budget
+            creates = [{'op': 'create', 'data': {'title': f'Charged {n}'}} for n in range(2)]
+            self.assertEqual(self.batch(creates).status_code, 200)
@@ -1,18 +1,47 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'tasks'
 
-urlpatterns = [
+sync_urlpatterns = [
     # Basic CRUD operations
     path('', views.TaskListCreateView.as_view(), name='task-list-create'),
+    path('bulk/', views.TaskBulkCreateView.as_view(), name='task-bulk-create'),
+    path('export/', views.TaskExportView.as_view(), name='task-export'),
+    path('import/', views.TaskImportView.as_view(), name='task-import'),
     path('<int:pk>/', views.TaskRetrieveUpdateDestroyView.as_view(), name='task-detail'),
-    
+
     # Task status operations
     path('<int:pk>/complete/', views.mark_task_completed, name='mark-task-completed'),
     path('<int:pk>/pending/', views.mark_task_pending, name='mark-task-pending'),
     path('<int:pk>/toggle/', views.toggle_task_completion, name='toggle-task-completion'),
-    
+    path('bulk/status/', views.bulk_update_task_status, name='task-bulk-status'),
+    path('batch/', views.TaskBatchView.as_view(), name='task-batch'),
+
+    # Delta sync and live events
+    path('changes/', views.task_changes, name='task-changes'),
+    path('events/', views.TaskEventStreamView.as_view(), name='task-events'),
+
     # Statistics
     path('stats/', views.task_stats, name='task-stats'),
-]
\ No newline at end of file
+    path('cache/', views.task_cache_stats, name='task-cache-stats'),
+]
+
+ASYNC_VIEWS = {
+    'task-list-create': async_views.TaskListCreateView.as_view(),
+    'task-detail': async_views.TaskRetrieveUpdateDestroyView.as_view(),
+    'mark-task-completed': async_views.MarkTaskCompletedView.as_view(),
+    'mark-task-pending': async_views.MarkTaskPendingView.as_view(),
+    'toggle-task-completion': async_views.ToggleTaskCompletionView.as_view(),
+    'task-stats': async_views.TaskStatsView.as_view(),
+}
+
+# Same routes with the async views swapped in; the other endpoints stay sync
+async_urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
+
+urlpatterns = async_urlpatterns if settings.TASK_ASYNC_VIEWS else sync_urlpatterns
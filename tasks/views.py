@@ -1,33 +1,155 @@
-from rest_framework import generics, status, filters
+import json
+
+from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Count, Q
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from application.throttles import (
-    TaskCreateRateThrottle, TaskUpdateRateThrottle, BurstRateThrottle,
-    LowSecurityThrottle, MediumSecurityThrottle
+    TaskCreateRateThrottle, TaskBulkCreateRateThrottle, TaskExportRateThrottle, TaskImportRateThrottle, TaskUpdateRateThrottle, BurstRateThrottle,
+    TaskBatchRateThrottle, LowSecurityThrottle
 )
-from .models import Task
+from .caching import cache_enabled, cached_response, hit_counter
+from .conditional import conditional_get, task_detail_validators, task_list_validators
+from .events import get_broker
+from .export import EXPORT_FORMATS, accepts_gzip, encode_stream, streaming_content
+from .filters import TaskOrderingFilter, TaskSearchFilter
+from .idempotency import IDEMPOTENCY_HEADER, idempotent
+from .imports import IMPORT_FORMATS, TaskImporter, guess_format
+from .models import Task, UserTaskState
+from .pagination import TaskKeysetPagination
 from .serializers import (
     TaskSerializer, 
     TaskCreateUpdateSerializer, 
     TaskListSerializer,
-    TaskStatsSerializer
+    TaskStatsSerializer,
+    TaskBulkCreateResultSerializer,
+    TaskBulkStatusSerializer,
+    TaskBulkStatusResultSerializer,
+    TaskBatchSerializer,
+    TaskBatchResultSerializer,
+    TaskChangesSerializer,
+    TaskCacheStatsSerializer,
+    ValuesListSerializer
 )
+from .sync import ExpiredToken, InvalidToken, changes_since
 
 
-class TaskListCreateView(generics.ListCreateAPIView):
-    permission_classes = [IsAuthenticated]
-    throttle_classes = [TaskCreateRateThrottle, BurstRateThrottle]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+TASK_FIELDS = TaskSerializer.Meta.fields
+
+FIELDS_PARAMETER = OpenApiParameter(
+    name='fields',
+    type=OpenApiTypes.STR,
+    description=(
+        'Comma-separated list of fields to return, out of: ' + ', '.join(TASK_FIELDS) + '. '
+        'Columns of fields that are not requested are not read from the database.'
+    )
+)
+
+IDEMPOTENCY_PARAMETER = OpenApiParameter(
+    name=IDEMPOTENCY_HEADER,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    description=(
+        'Unique key of the request, up to 255 characters. Retries with the same key get the '
+        'first response back (with an Idempotent-Replayed header) instead of repeating the change.'
+    )
+)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Support ``?fields=`` on GET requests: the serializer only renders the
+    requested fields and the queryset only loads their columns, plus the
+    ordering columns that keyset pagination reads.
+
+    Querysets are always scoped to the requesting user, so ``user`` is filled
+    in from the request rather than fetched.
+    """
+    fields_query_param = 'fields'
+
+    def get_sparse_fields(self):
+        """Return the requested fields in declaration order, or None"""
+        raw = self.request.query_params.get(self.fields_query_param)
+        if self.request.method != 'GET' or not raw:
+            return None
+        names = {name.strip() for name in raw.split(',') if name.strip()}
+        unknown = sorted(names - set(TASK_FIELDS))
+        if unknown or not names:
+            raise ValidationError({
+                self.fields_query_param: [f"Choose from: {', '.join(TASK_FIELDS)}"]
+            })
+        return [name for name in TASK_FIELDS if name in names]
+
+    def get_output_fields(self):
+        return self.get_sparse_fields() or self.get_serializer_class().Meta.fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method != 'GET':
+            return super().get_serializer(*args, **kwargs)
+        fields = self.get_output_fields()
+        if 'user' in fields and args:
+            instances = args[0] if kwargs.get('many') else [args[0]]
+            for instance in instances:
+                instance.user = self.request.user
+        return super().get_serializer(*args, fields=fields, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != 'GET':
+            return queryset
+        ordering = [term.lstrip('-') for term in queryset.query.order_by if isinstance(term, str)]
+        columns = {
+            name for name in [*self.get_output_fields(), *ordering]
+            if name != 'user' and name not in queryset.query.annotations
+        }
+        return queryset.only(*columns)
+
+
+class ValuesListMixin:
+    """
+    Serve list requests from ``values_list()`` rows instead of model
+    instances whenever the serializer only reads plain columns (see
+    ValuesListSerializer). The response is the same.
+    """
+    def list(self, request, *args, **kwargs):
+        rows = self.get_values_list_serializer()
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(rows.values_list(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(rows.to_representation(page))
+
+    def get_values_list_serializer(self):
+        serializer = self.get_serializer()
+        if not ValuesListSerializer.supports(serializer):
+            return None
+        return ValuesListSerializer(serializer)
+
+
+class TaskFilteringMixin:
+    """Filtering, searching and ordering shared by the task list and export"""
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, TaskOrderingFilter]
     filterset_fields = ['completed']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'updated_at', 'title']
     ordering = ['-created_at']
 
+
+class TaskListCreateView(TaskFilteringMixin, SparseFieldsetViewMixin, ValuesListMixin, generics.ListCreateAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TaskCreateRateThrottle, BurstRateThrottle]
+    pagination_class = TaskKeysetPagination
+
     def get_queryset(self):
         # Users can only see their own tasks
         return Task.objects.filter(user=self.request.user)
@@ -35,27 +157,40 @@ class TaskListCreateView(generics.ListCreateAPIView):
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return TaskCreateUpdateSerializer
+        if self.get_sparse_fields():
+            return TaskSerializer
         return TaskListSerializer
 
     @extend_schema(
         summary="List user's tasks",
-        description="Get a list of all tasks belonging to the authenticated user. Supports filtering, searching, and ordering.",
+        description=(
+            "Get a page of tasks belonging to the authenticated user. Supports filtering, searching, "
+            "and ordering; follow the next/previous cursor links to page through the results. "
+            "Send the returned ETag in If-None-Match to get 304 Not Modified while nothing has changed."
+        ),
         parameters=[
             OpenApiParameter(name='completed', type=OpenApiTypes.BOOL, description='Filter by completion status'),
-            OpenApiParameter(name='search', type=OpenApiTypes.STR, description='Search in title and description'),
-            OpenApiParameter(name='ordering', type=OpenApiTypes.STR, description='Order by: created_at, updated_at, title (prefix with - for descending)')
+            OpenApiParameter(name='search', type=OpenApiTypes.STR, description='Full-text search in title and description; every word must match the start of a word'),
+            OpenApiParameter(name='ordering', type=OpenApiTypes.STR, description='Order by: created_at, updated_at, title (prefix with - for descending). Search results are ordered by relevance unless another ordering is given'),
+            FIELDS_PARAMETER
         ],
-        responses={200: TaskListSerializer(many=True)}
+        responses={200: TaskListSerializer(many=True), 304: None}
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return cached_response(request, 'list', lambda: conditional_get(
+            request,
+            task_list_validators(request),
+            lambda: super(TaskListCreateView, self).get(request, *args, **kwargs)
+        ))
 
     @extend_schema(
         summary="Create a new task",
         description="Create a new task for the authenticated user",
         request=TaskCreateUpdateSerializer,
+        parameters=[IDEMPOTENCY_PARAMETER],
         responses={201: TaskSerializer}
     )
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = TaskCreateUpdateSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
@@ -63,7 +198,207 @@ class TaskListCreateView(generics.ListCreateAPIView):
         return Response(TaskSerializer(task).data, status=status.HTTP_201_CREATED)
 
 
-class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class TaskExportView(TaskFilteringMixin, generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TaskExportRateThrottle, BurstRateThrottle]
+    format_query_param = 'type'
+
+    def get_queryset(self):
+        return Task.objects.filter(user=self.request.user)
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export picks its own content type; errors are still rendered as JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(
+        summary="Export user's tasks",
+        description=(
+            "Stream every task of the authenticated user as NDJSON (one JSON object per line) "
+            "or CSV. Accepts the same completed, search and ordering parameters as the task list. "
+            "The body is gzip-compressed on the fly when the client sends Accept-Encoding: gzip."
+        ),
+        parameters=[
+            OpenApiParameter(name='type', type=OpenApiTypes.STR, enum=list(EXPORT_FORMATS), description='Export format (default: ndjson)'),
+            OpenApiParameter(name='completed', type=OpenApiTypes.BOOL, description='Filter by completion status'),
+            OpenApiParameter(name='search', type=OpenApiTypes.STR, description='Full-text search in title and description'),
+            OpenApiParameter(name='ordering', type=OpenApiTypes.STR, description='Order by: created_at, updated_at, title (prefix with - for descending)')
+        ],
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR, (200, 'text/csv'): OpenApiTypes.STR}
+    )
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get(self.format_query_param, 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Unsupported export type, choose from: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        stream, content_type = EXPORT_FORMATS[export_format]
+        queryset = self.filter_queryset(self.get_queryset())
+
+        gzip = accepts_gzip(request)
+        response = StreamingHttpResponse(
+            streaming_content(request._request, encode_stream(stream(queryset), gzip=gzip)),
+            content_type=f'{content_type}; charset=utf-8'
+        )
+        if gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response.headers['Content-Disposition'] = f'attachment; filename="tasks.{export_format}"'
+        return response
+
+
+class TaskImportView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TaskImportRateThrottle, BurstRateThrottle]
+    parser_classes = [MultiPartParser]
+    format_query_param = 'type'
+
+    @extend_schema(
+        summary="Import tasks from a file",
+        description=(
+            "Upload an NDJSON or CSV file of tasks (title, description, completed) as the "
+            "multipart field 'file'. Rows are validated like single task creation and inserted "
+            "in batches as the file is read. The response streams NDJSON events: an 'error' "
+            "event per rejected row, a 'progress' event after each committed batch and a final "
+            "'done' event with the totals."
+        ),
+        parameters=[
+            OpenApiParameter(name='type', type=OpenApiTypes.STR, enum=list(IMPORT_FORMATS), description='File format (default: guessed from the file name, else ndjson)'),
+        ],
+        request={'multipart/form-data': {'type': 'object', 'properties': {'file': {'type': 'string', 'format': 'binary'}}}},
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR}
+    )
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "Upload the tasks as the multipart field 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.query_params.get(self.format_query_param) or guess_format(upload.name)
+        if import_format not in IMPORT_FORMATS:
+            return Response(
+                {'error': f"Unsupported import type, choose from: {', '.join(IMPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        events = TaskImporter(request.user).run(IMPORT_FORMATS[import_format](upload))
+        return StreamingHttpResponse(
+            streaming_content(request._request, (json.dumps(event) + '\n' for event in events)),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+
+
+class TaskEventStreamView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [BurstRateThrottle]
+    heartbeat_interval = 15
+
+    def perform_content_negotiation(self, request, force=False):
+        # The stream is always text/event-stream; errors are still rendered as JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(
+        summary="Stream task events",
+        description=(
+            "Server-Sent Events stream of the authenticated user's task changes: task.created, "
+            "task.updated (data: the task) and task.deleted (data: its id). A ready event is sent "
+            "once the stream is subscribed; fetch the changes since your last sync token then, and "
+            "again whenever a resync event arrives, since events can be missed. Comment lines are "
+            "sent as heartbeats. Only served by the ASGI application."
+        ),
+        responses={(200, 'text/event-stream'): OpenApiTypes.STR, 501: None}
+    )
+    def get(self, request, *args, **kwargs):
+        if not isinstance(request._request, ASGIRequest):
+            return Response(
+                {'error': 'Event streams are only served by the ASGI application'},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        # The stream never touches the database; release the connection now
+        # rather than when the stream ends
+        close_old_connections()
+        response = StreamingHttpResponse(self.stream(request.user.pk), content_type='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        # Tell nginx not to buffer the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, user_id):
+        subscription = get_broker().subscribe(user_id)
+        try:
+            yield 'retry: 5000\nevent: ready\ndata: {}\n\n'
+            while True:
+                event = await subscription.get(self.heartbeat_interval)
+                if event is None:
+                    yield ': heartbeat\n\n'
+                else:
+                    yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            subscription.close()
+
+
+class TaskBulkCreateView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TaskBulkCreateRateThrottle, BurstRateThrottle]
+    serializer_class = TaskCreateUpdateSerializer
+    max_batch_size = 100
+
+    @extend_schema(
+        summary="Create tasks in bulk",
+        description=(
+            "Create up to 100 tasks for the authenticated user in one request. "
+            "Each item is validated independently; valid items are inserted together "
+            "and the response reports the outcome of every item. Each submitted task "
+            "counts against the task creation rate limit."
+        ),
+        request=TaskCreateUpdateSerializer(many=True),
+        parameters=[IDEMPOTENCY_PARAMETER],
+        responses={
+            201: TaskBulkCreateResultSerializer,
+            207: TaskBulkCreateResultSerializer,
+            400: TaskBulkCreateResultSerializer,
+        }
+    )
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty list of tasks'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response(
+                {'error': f'At most {self.max_batch_size} tasks can be created at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = TaskCreateUpdateSerializer(data=item, context={'request': request})
+            if serializer.is_valid():
+                valid.append((index, Task(user=request.user, **serializer.validated_data)))
+            else:
+                results[index] = {'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors}
+
+        with transaction.atomic():
+            created = Task.objects.bulk_create([task for _, task in valid])
+
+        for (index, _), task in zip(valid, created):
+            results[index] = {'index': index, 'status': status.HTTP_201_CREATED, 'task': TaskSerializer(task).data}
+
+        failed = len(items) - len(created)
+        if not failed:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({
+            'created': len(created),
+            'failed': failed,
+            'results': results,
+        }, status=response_status)
+
+
+class TaskRetrieveUpdateDestroyView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     throttle_classes = [TaskUpdateRateThrottle, BurstRateThrottle]
 
@@ -78,18 +413,28 @@ class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
     @extend_schema(
         summary="Get task details",
-        description="Retrieve detailed information about a specific task",
-        responses={200: TaskSerializer}
+        description=(
+            "Retrieve detailed information about a specific task. "
+            "Supports conditional requests with If-None-Match and If-Modified-Since."
+        ),
+        parameters=[FIELDS_PARAMETER],
+        responses={200: TaskSerializer, 304: None}
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return cached_response(request, 'detail', lambda: conditional_get(
+            request,
+            task_detail_validators(request, kwargs['pk']),
+            lambda: super(TaskRetrieveUpdateDestroyView, self).get(request, *args, **kwargs)
+        ))
 
     @extend_schema(
         summary="Update task",
         description="Update a specific task (full update)",
         request=TaskCreateUpdateSerializer,
+        parameters=[IDEMPOTENCY_PARAMETER],
         responses={200: TaskSerializer}
     )
+    @idempotent
     def put(self, request, *args, **kwargs):
         task = self.get_object()
         serializer = TaskCreateUpdateSerializer(task, data=request.data, context={'request': request})
@@ -101,8 +446,10 @@ class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         summary="Partially update task",
         description="Partially update a specific task",
         request=TaskCreateUpdateSerializer,
+        parameters=[IDEMPOTENCY_PARAMETER],
         responses={200: TaskSerializer}
     )
+    @idempotent
     def patch(self, request, *args, **kwargs):
         task = self.get_object()
         serializer = TaskCreateUpdateSerializer(task, data=request.data, partial=True, context={'request': request})
@@ -113,70 +460,208 @@ class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     @extend_schema(
         summary="Delete task",
         description="Delete a specific task permanently",
+        parameters=[IDEMPOTENCY_PARAMETER],
         responses={204: None}
     )
+    @idempotent
     def delete(self, request, *args, **kwargs):
         return super().delete(request, *args, **kwargs)
 
 
+def set_task_completed(request, pk, completed):
+    """
+    Apply a status change to one of the user's tasks with a single UPDATE and
+    respond with the task as it is after the change.
+    """
+    tasks = Task.objects.filter(pk=pk, user=request.user)
+    changed = tasks.set_completed(completed)
+    if changed:
+        task = changed[0]
+    else:
+        # Nothing changed: the task is either missing or already in that state
+        task = tasks.first()
+        if task is None:
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+    task.user = request.user
+    return Response(TaskSerializer(task).data)
+
+
 @extend_schema(
     summary="Mark task as completed",
     description="Mark a specific task as completed",
     request=None,
+    parameters=[IDEMPOTENCY_PARAMETER],
     responses={200: TaskSerializer}
 )
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([TaskUpdateRateThrottle, BurstRateThrottle])
+@idempotent
 def mark_task_completed(request, pk):
     """Mark a task as completed"""
-    try:
-        task = Task.objects.get(pk=pk, user=request.user)
-        task.completed = True
-        task.save()
-        return Response(TaskSerializer(task).data)
-    except Task.DoesNotExist:
-        return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+    return set_task_completed(request, pk, True)
 
 
 @extend_schema(
     summary="Mark task as pending",
     description="Mark a specific task as pending (not completed)",
     request=None,
+    parameters=[IDEMPOTENCY_PARAMETER],
     responses={200: TaskSerializer}
 )
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([TaskUpdateRateThrottle, BurstRateThrottle])
+@idempotent
 def mark_task_pending(request, pk):
     """Mark a task as pending"""
-    try:
-        task = Task.objects.get(pk=pk, user=request.user)
-        task.completed = False
-        task.save()
-        return Response(TaskSerializer(task).data)
-    except Task.DoesNotExist:
-        return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+    return set_task_completed(request, pk, False)
 
 
 @extend_schema(
     summary="Toggle task completion",
     description="Toggle the completion status of a specific task",
     request=None,
+    parameters=[IDEMPOTENCY_PARAMETER],
     responses={200: TaskSerializer}
 )
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([TaskUpdateRateThrottle, BurstRateThrottle])
+@idempotent
 def toggle_task_completion(request, pk):
     """Toggle task completion status"""
-    try:
-        task = Task.objects.get(pk=pk, user=request.user)
-        task.completed = not task.completed
-        task.save()
-        return Response(TaskSerializer(task).data)
-    except Task.DoesNotExist:
-        return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+    return set_task_completed(request, pk, None)
+
+
+BULK_STATUS_VALUES = {
+    'complete': True,
+    'pending': False,
+    'toggle': None,
+}
+
+
+@extend_schema(
+    summary="Change the status of many tasks",
+    description=(
+        "Mark tasks as completed, mark them as pending, or toggle them. Select the tasks "
+        "either by 'ids' or by a 'filter' on status and creation time (for example all "
+        "pending tasks created before a date). Only the authenticated user's tasks are "
+        "changed, in a single update."
+    ),
+    request=TaskBulkStatusSerializer,
+    parameters=[IDEMPOTENCY_PARAMETER],
+    responses={200: TaskBulkStatusResultSerializer}
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([TaskUpdateRateThrottle, BurstRateThrottle])
+@idempotent
+def bulk_update_task_status(request):
+    """Complete, reopen or toggle many tasks at once"""
+    serializer = TaskBulkStatusSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    tasks = Task.objects.filter(user=request.user)
+    if 'ids' in data:
+        tasks = tasks.filter(pk__in=data['ids'])
+    else:
+        criteria = data['filter']
+        if 'completed' in criteria:
+            tasks = tasks.filter(completed=criteria['completed'])
+        if 'created_before' in criteria:
+            tasks = tasks.filter(created_at__lt=criteria['created_before'])
+        if 'created_after' in criteria:
+            tasks = tasks.filter(created_at__gte=criteria['created_after'])
+
+    changed = tasks.set_completed(BULK_STATUS_VALUES[data['action']])
+
+    return Response({
+        'updated': len(changed),
+        'tasks': [{'id': task.pk, 'completed': task.completed} for task in changed],
+    })
+
+
+class TaskBatchView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TaskBatchRateThrottle, BurstRateThrottle]
+    serializer_class = TaskBatchSerializer
+    max_batch_size = 100
+
+    def get_queryset(self):
+        # Operations only reach the user's own tasks
+        return Task.objects.filter(user=self.request.user)
+
+    @extend_schema(
+        summary="Run many task operations at once",
+        description=(
+            "Run up to 100 operations in order, in one transaction: 'create' (with 'data'), "
+            "'update' (a partial update, with 'id' and 'data'), 'delete', 'complete', 'pending' "
+            "and 'toggle' (with 'id'). The response reports the outcome of every operation. "
+            "With 'stop_on_error' the operations after the first failure are skipped (status 424). "
+            "Each operation counts against the task creation or update rate limit."
+        ),
+        request=TaskBatchSerializer,
+        parameters=[IDEMPOTENCY_PARAMETER],
+        responses={200: TaskBatchResultSerializer, 207: TaskBatchResultSerializer}
+    )
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        serializer = TaskBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+        stop_on_error = serializer.validated_data['stop_on_error']
+
+        results = []
+        with transaction.atomic():
+            for index, operation in enumerate(operations):
+                # Failures are found before anything is written, so the
+                # operations before and after them are unaffected
+                try:
+                    result = self.perform_operation(operation)
+                except ValidationError as exc:
+                    result = {'status': status.HTTP_400_BAD_REQUEST, 'errors': exc.detail}
+                except Http404:
+                    result = {'status': status.HTTP_404_NOT_FOUND, 'errors': {'error': 'Task not found'}}
+                results.append({'index': index, **result})
+                if stop_on_error and 'errors' in result:
+                    break
+
+        failed = sum('errors' in result for result in results)
+        skipped = len(operations) - len(results)
+        for index in range(len(results), len(operations)):
+            results.append({'index': index, 'status': status.HTTP_424_FAILED_DEPENDENCY})
+
+        return Response({
+            'succeeded': len(results) - failed - skipped,
+            'failed': failed,
+            'skipped': skipped,
+            'results': results,
+        }, status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK)
+
+    def perform_operation(self, operation):
+        request = self.request
+        op = operation['op']
+        if op == 'create':
+            serializer = TaskCreateUpdateSerializer(data=operation['data'], context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            task = serializer.save(user=request.user)
+            return {'status': status.HTTP_201_CREATED, 'task': TaskSerializer(task).data}
+
+        if op in BULK_STATUS_VALUES:
+            response = set_task_completed(request, operation['id'], BULK_STATUS_VALUES[op])
+            if response.status_code != status.HTTP_200_OK:
+                return {'status': response.status_code, 'errors': response.data}
+            return {'status': response.status_code, 'task': response.data}
+
+        task = get_object_or_404(self.get_queryset(), pk=operation['id'])
+        if op == 'delete':
+            task.delete()
+            return {'status': status.HTTP_204_NO_CONTENT}
+        serializer = TaskCreateUpdateSerializer(task, data=operation['data'], partial=True, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        return {'status': status.HTTP_200_OK, 'task': TaskSerializer(serializer.save()).data}
 
 
 @extend_schema(
@@ -189,19 +674,75 @@ def toggle_task_completion(request, pk):
 @throttle_classes([LowSecurityThrottle])
 def task_stats(request):
     """Get user's task statistics"""
-    user_tasks = Task.objects.filter(user=request.user)
-    
-    total_tasks = user_tasks.count()
-    completed_tasks = user_tasks.filter(completed=True).count()
-    pending_tasks = total_tasks - completed_tasks
-    completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-    
-    stats = {
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'completion_rate': round(completion_rate, 2)
+    return cached_response(
+        request, 'stats', lambda: Response(task_stats_data(UserTaskState.for_user(request.user)))
+    )
+
+
+def task_stats_data(state):
+    return {
+        'total_tasks': state.task_count,
+        'completed_tasks': state.completed_count,
+        'pending_tasks': state.pending_count,
+        'completion_rate': state.completion_rate
     }
-    
-    return Response(stats)
 
+
+@extend_schema(
+    summary="Get task cache statistics",
+    description=(
+        "Hits, misses and hit rate of the per-user cache of task lists, details and statistics, "
+        "counted across all workers since the last reset. DELETE resets the counters. Staff only."
+    ),
+    responses={200: TaskCacheStatsSerializer, 204: None}
+)
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+@throttle_classes([LowSecurityThrottle])
+def task_cache_stats(request):
+    """Get or reset the task cache hit/miss counters"""
+    if request.method == 'DELETE':
+        hit_counter.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(TaskCacheStatsSerializer({
+        'enabled': cache_enabled(),
+        'ttl': settings.TASK_CACHE_TTL,
+        **hit_counter.totals(),
+    }).data)
+
+
+@extend_schema(
+    summary="Get task changes",
+    description=(
+        "Delta sync for clients that keep a local copy of their tasks. Returns the tasks created "
+        "or updated since the token (all tasks when no token is given), the ids of tasks deleted "
+        "since then and a token for the next call. While has_more is true, call again with the "
+        "new token straight away. Changes from the last few seconds may be sent again, so apply "
+        "them as upserts. A token older than the tombstone retention period is answered with "
+        "410 Gone: drop the local copy and sync again without a token."
+    ),
+    parameters=[
+        OpenApiParameter(name='since', type=OpenApiTypes.STR, description='Token returned by the previous call'),
+    ],
+    responses={200: TaskChangesSerializer, 400: None, 410: None}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([LowSecurityThrottle])
+def task_changes(request):
+    """Get the changes to the user's tasks since a sync token"""
+    try:
+        changed, deleted, has_more, token = changes_since(request.user, request.query_params.get('since'))
+    except InvalidToken:
+        return Response({'error': 'Invalid sync token'}, status=status.HTTP_400_BAD_REQUEST)
+    except ExpiredToken:
+        return Response({'error': 'Sync token expired, sync again without a token'}, status=status.HTTP_410_GONE)
+
+    for task in changed:
+        task.user = request.user
+    return Response(TaskChangesSerializer({
+        'changed': changed,
+        'deleted': deleted,
+        'has_more': has_more,
+        'token': token,
+    }).data)